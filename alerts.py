@@ -0,0 +1,273 @@
+import asyncio
+import html
+import logging
+import os
+import time
+import zlib
+from collections import deque
+from urllib.parse import urlsplit
+
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+
+import metrics
+from cache import get_products
+
+# 🔔 Подписки на категории, поиск изменений и рассылка уведомлений
+
+BONUS_MIN_PCT = int(os.getenv("BONUS_MIN_PCT", 20))
+BONUS_MIN_RUB = int(os.getenv("BONUS_MIN_RUB", 200))
+ALERTS_INTERVAL = int(os.getenv("ALERTS_INTERVAL", 900))
+# Лимиты Telegram: ~30 сообщений в секунду всего и 1 в секунду в один чат
+ALERTS_RATE = float(os.getenv("ALERTS_RATE", 25))
+ALERTS_CHAT_INTERVAL = float(os.getenv("ALERTS_CHAT_INTERVAL", 1.1))
+ALERTS_BATCH = int(os.getenv("ALERTS_BATCH", 10))
+# Товар, которого не было на странице дольше этого срока, при возвращении снова считается новым
+ALERTS_FORGET_AFTER = int(os.getenv("ALERTS_FORGET_AFTER", 7 * 24 * 3600))
+
+SUBS_PREFIX = "wb:subs"
+CATEGORIES_KEY = f"{SUBS_PREFIX}:cats"
+CATEGORY_KEYS = "wb:catkeys"
+# Отпечатки по пути URL (v2) — со старыми ключами по полному URL не смешиваются
+FINGERPRINTS_PREFIX = "wb:fp2"
+
+
+# 🔑 Короткий ключ для URL — callback_data в Telegram ограничена 64 байтами
+def short_key(url):
+    return format(zlib.crc32(url.encode()), "x")
+
+
+async def remember_category(redis, category_url):
+    key = short_key(category_url)
+    await redis.hset(CATEGORY_KEYS, key, category_url)
+    return key
+
+
+async def category_by_key(redis, key):
+    return await redis.hget(CATEGORY_KEYS, key)
+
+
+# 📝 Подписки
+async def subscribe(redis, chat_id, category_url):
+    pipe = redis.pipeline()
+    pipe.sadd(f"{SUBS_PREFIX}:chat:{chat_id}", category_url)
+    pipe.sadd(f"{SUBS_PREFIX}:cat:{category_url}", chat_id)
+    pipe.sadd(CATEGORIES_KEY, category_url)
+    await pipe.execute()
+
+
+async def unsubscribe(redis, chat_id, category_url):
+    pipe = redis.pipeline()
+    pipe.srem(f"{SUBS_PREFIX}:chat:{chat_id}", category_url)
+    pipe.srem(f"{SUBS_PREFIX}:cat:{category_url}", chat_id)
+    await pipe.execute()
+
+    # Больше никто не подписан — категорию не опрашиваем
+    if not await redis.scard(f"{SUBS_PREFIX}:cat:{category_url}"):
+        await redis.srem(CATEGORIES_KEY, category_url)
+        await redis.delete(f"{FINGERPRINTS_PREFIX}:{category_url}", f"{FINGERPRINTS_PREFIX}:{category_url}:seen")
+
+
+async def list_subscriptions(redis, chat_id):
+    return sorted(await redis.smembers(f"{SUBS_PREFIX}:chat:{chat_id}"))
+
+
+# 🎚 Пороги бонуса для чата (по умолчанию BONUS_MIN_PCT / BONUS_MIN_RUB)
+async def get_thresholds(redis, chat_id):
+    values = await redis.hmget(f"{SUBS_PREFIX}:thresholds:{chat_id}", "pct", "rub")
+    pct, rub = values
+    return (
+        int(pct) if pct is not None else BONUS_MIN_PCT,
+        int(rub) if rub is not None else BONUS_MIN_RUB,
+    )
+
+
+async def set_thresholds(redis, chat_id, pct, rub):
+    await redis.hset(f"{SUBS_PREFIX}:thresholds:{chat_id}", mapping={"pct": pct, "rub": rub})
+
+
+def qualifies(item, min_pct, min_rub):
+    return item["bonus"] >= min_rub and item["bonus"] * 100 >= min_pct * item["price"]
+
+
+# 🔖 Поле отпечатка — по пути без query: у HTML-ссылок бывает ?size=..., у API — нет
+def fingerprint_field(url):
+    return short_key(urlsplit(url).path.rstrip("/"))
+
+
+# 🧮 Новые и изменившиеся товары таблицы по сравнению со всеми прошлыми проходами
+#   В Redis: hash crc32(путь) -> "цена:бонус" и zset crc32(путь) -> когда товар видели последним
+#   Отпечатки сливаются, а не заменяются: товар, выпавший с первой страницы и вернувшийся,
+#   не новый; забываются только те, кого не было дольше ALERTS_FORGET_AFTER
+async def diff_products(redis, category_url, table):
+    key = f"{FINGERPRINTS_PREFIX}:{category_url}"
+    seen_key = f"{key}:seen"
+    now = time.time()
+
+    forgotten = await redis.zrangebyscore(seen_key, "-inf", now - ALERTS_FORGET_AFTER)
+    if forgotten:
+        pipe = redis.pipeline()
+        pipe.hdel(key, *forgotten)
+        pipe.zrem(seen_key, *forgotten)
+        await pipe.execute()
+
+    first_run = not await redis.exists(key)
+
+    by_field = {fingerprint_field(url): i for i, url in enumerate(table.urls)}
+    current = {
+        field: f"{table.prices[i]}:{table.bonuses[i]}"
+        for field, i in by_field.items()
+    }
+    fields = list(current)
+    previous = await redis.hmget(key, fields) if fields and not first_run else [None] * len(fields)
+
+    changed = [
+        table.row(by_field[field]) for field, old in zip(fields, previous)
+        if old != current[field]
+    ]
+
+    if current:
+        pipe = redis.pipeline()
+        pipe.hset(key, mapping=current)
+        pipe.zadd(seen_key, dict.fromkeys(current, now))
+        # Категория, которую перестали проверять, удаляется целиком
+        pipe.expire(key, ALERTS_FORGET_AFTER)
+        pipe.expire(seen_key, ALERTS_FORGET_AFTER)
+        await pipe.execute()
+
+    # Первый проход только запоминает состояние, иначе подписчик получит весь каталог
+    return [] if first_run else changed
+
+
+# 🖋 Один товар в сообщении (parse_mode="HTML": «&», «<», «>» и кавычки экранируются,
+#   иначе Telegram отклонит всё сообщение вместе с остальными товарами пачки)
+def format_item(item):
+    return (
+        f"🛍 <b>{html.escape(item['name'])}</b>\n"
+        f"💰 Цена: {item['price']} ₽\n"
+        f"🎁 Бонус: {item['bonus']} ₽\n"
+        f"🔗 <a href='{html.escape(item['url'])}'>Смотреть</a>\n\n"
+    )
+
+
+# 📤 Отправка с учётом лимитов Telegram: общий темп и пауза между сообщениями в чат
+#   У каждого чата своя очередь — ожидание паузы одного чата не задерживает остальные
+class AlertSender:
+    def __init__(self, bot, redis):
+        self.bot = bot
+        self.redis = redis
+        self.pending = {}
+        self.wakeup = asyncio.Event()
+        self.interval = 1 / ALERTS_RATE
+        self.last_sent = {}
+
+    def qsize(self):
+        return sum(len(texts) for texts in self.pending.values())
+
+    # Товары склеиваются в сообщения по ALERTS_BATCH штук
+    def send(self, chat_id, items):
+        texts = self.pending.setdefault(chat_id, deque())
+
+        for start in range(0, len(items), ALERTS_BATCH):
+            batch = items[start:start + ALERTS_BATCH]
+            texts.append("🔔 Новые товары с бонусом:\n\n" + "".join(format_item(item) for item in batch))
+
+        self.wakeup.set()
+
+    async def _deliver(self, chat_id, text):
+        while True:
+            try:
+                with metrics.TELEGRAM_SECONDS.time(method="send_message"):
+                    await self.bot.send_message(chat_id, text, parse_mode="HTML", disable_web_page_preview=True)
+                return
+            except TelegramRetryAfter as e:
+                logging.warning(f"[alerts] Flood control, ждём {e.retry_after} с")
+                await asyncio.sleep(e.retry_after)
+            except TelegramForbiddenError:
+                # Пользователь заблокировал бота — подписки и очередь больше не нужны
+                self.pending.pop(chat_id, None)
+                for category_url in await list_subscriptions(self.redis, chat_id):
+                    await unsubscribe(self.redis, chat_id, category_url)
+                return
+
+    # Чат, которому уже можно писать (по кругу), или время до ближайшего такого
+    def _next_chat(self):
+        now = time.monotonic()
+        soonest = None
+
+        for chat_id in self.pending:
+            ready_at = self.last_sent.get(chat_id, 0) + ALERTS_CHAT_INTERVAL
+            if ready_at <= now:
+                return chat_id, 0
+            soonest = ready_at if soonest is None else min(soonest, ready_at)
+
+        return None, soonest - now
+
+    async def run(self):
+        while True:
+            if not self.pending:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            chat_id, wait = self._next_chat()
+            if chat_id is None:
+                await asyncio.sleep(wait)
+                continue
+
+            texts = self.pending.pop(chat_id)
+            text = texts.popleft()
+            if texts:
+                # В конец очереди чатов — остальные не ждут, пока этот выговорится
+                self.pending[chat_id] = texts
+
+            try:
+                await self._deliver(chat_id, text)
+            except Exception as e:
+                logging.error("[alerts] Не удалось отправить в чат %s: %s", chat_id, repr(e))
+            finally:
+                self.last_sent[chat_id] = time.monotonic()
+
+            await asyncio.sleep(self.interval)
+
+
+# 🔁 Один общий парсинг на категорию, фильтр — по порогам каждого подписчика
+async def check_subscriptions(redis, sender):
+    pending = {}
+
+    for category_url in await redis.smembers(CATEGORIES_KEY):
+        try:
+            # Устаревший кэш сравнивался бы с прошлой проверкой — уведомления опаздывали бы на интервал
+            table = await get_products(redis, category_url, fresh=True)
+            changed = await diff_products(redis, category_url, table)
+        except Exception as e:
+            logging.error("[alerts] Ошибка при проверке %s: %s", category_url, repr(e))
+            continue
+
+        if not changed:
+            continue
+
+        for chat_id in await redis.smembers(f"{SUBS_PREFIX}:cat:{category_url}"):
+            min_pct, min_rub = await get_thresholds(redis, chat_id)
+            matches = [item for item in changed if qualifies(item, min_pct, min_rub)]
+            if matches:
+                pending.setdefault(chat_id, []).extend(matches)
+
+    for chat_id, items in pending.items():
+        sender.send(int(chat_id), items)
+
+    logging.info(f"[alerts] Уведомлений в очереди: {sender.qsize()}")
+
+
+async def run_alerts(bot, redis):
+    sender = AlertSender(bot, redis)
+    sender_task = asyncio.create_task(sender.run())
+
+    try:
+        while True:
+            try:
+                await check_subscriptions(redis, sender)
+            except Exception as e:
+                logging.error("[alerts] Ошибка проверки подписок: %s", repr(e))
+            await asyncio.sleep(ALERTS_INTERVAL)
+    finally:
+        sender_task.cancel()
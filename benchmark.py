@@ -0,0 +1,410 @@
+import argparse
+import asyncio
+import contextlib
+import gc
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+# 🏁 Офлайн-бенчмарк: записанные страницы Wildberries отдаются локальным мок-сервером
+#   python benchmark.py --output bench.json
+#   python benchmark.py --compare bench.json   — выход с кодом 1 при регрессии
+
+# Мок-сервер один, лимиты и прокси боевого режима в замерах не нужны
+os.environ.setdefault("WB_RATE", "1000000")
+os.environ.setdefault("WB_MAX_RATE", "1000000")
+os.environ.setdefault("WB_BURST", "1000000")
+os.environ.setdefault("WB_HOST_CONCURRENCY", "64")
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "123456:benchmark-token")
+for name in ("PROXY_URL", "PROXY_URLS", "PROXY_FILE"):
+    os.environ.pop(name, None)
+
+from aiohttp import web  # noqa: E402
+
+import fetcher  # noqa: E402
+import monitor_playwright  # noqa: E402
+import parsers  # noqa: E402
+import wb_api  # noqa: E402
+
+FIXTURES = Path(__file__).parent / "fixtures"
+HOST = "127.0.0.1"
+
+
+# 🧪 Мок-сервер Wildberries: каталог, страницы категорий, меню и JSON API
+def _scale_html(html, scale):
+    # Карточки между первой product-card и промо-блоком повторяются scale раз
+    start = html.find('<div class="product-card j-card-item"')
+    end = html.find('<div class="product-card-promo">')
+    if scale <= 1 or start < 0 or end < 0:
+        return html
+    return html[:start] + html[start:end] * scale + html[end:]
+
+
+def _scale_api(payload, scale):
+    products = payload["data"]["products"]
+    payload["data"]["products"] = [
+        {**product, "id": product["id"] + copy * 10_000_000}
+        for copy in range(scale) for product in products
+    ]
+    return json.dumps(payload, ensure_ascii=False).encode()
+
+
+def make_app(scale=1, latency_ms=0, pages=10):
+    catalog_html = (FIXTURES / "catalog.html").read_text(encoding="utf-8")
+    category_html = _scale_html((FIXTURES / "category_page.html").read_text(encoding="utf-8"), scale)
+    menu_json = (FIXTURES / "menu.json").read_bytes()
+    api_json = _scale_api(json.loads((FIXTURES / "catalog_api.json").read_bytes()), scale)
+    empty_api = json.dumps({"data": {"products": []}}).encode()
+
+    async def delay():
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+
+    async def catalog(request):
+        await delay()
+        return web.Response(text=catalog_html, content_type="text/html")
+
+    async def category(request):
+        await delay()
+        if int(request.query.get("page", 1)) > pages:
+            return web.Response(text="<html><body></body></html>", content_type="text/html")
+        return web.Response(text=category_html, content_type="text/html")
+
+    async def menu(request):
+        await delay()
+        return web.Response(body=menu_json, content_type="application/json")
+
+    async def api(request):
+        await delay()
+        body = api_json if int(request.query.get("page", 1)) <= pages else empty_api
+        return web.Response(body=body, content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/catalog", catalog)
+    app.router.add_get("/catalog/{path:.+}", category)
+    app.router.add_get("/menu.json", menu)
+    app.router.add_get("/api/{shard}/v2/catalog", api)
+    return app
+
+
+async def start_mock_server(port, **kwargs):
+    runner = web.AppRunner(make_app(**kwargs), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, HOST, port)
+    await site.start()
+
+    base_url = f"http://{HOST}:{runner.addresses[0][1]}"
+
+    # Весь код парсера смотрит на мок вместо wildberries.ru
+    monitor_playwright.WB_BASE_URL = base_url
+    monitor_playwright.WB_MAIN_CATALOG = f"{base_url}/catalog"
+    wb_api.WB_BASE_URL = base_url
+    wb_api.WB_MENU_URL = f"{base_url}/menu.json"
+    wb_api.WB_API_URL = base_url + "/api/{shard}/v2/catalog"
+    wb_api._menu.update(ts=0.0, paths={})
+
+    return runner, base_url
+
+
+# 🤖 Фейковый Telegram: edit_text только запоминает текст (и ждёт, если задана задержка)
+class FakeMessage:
+    def __init__(self, chat_id, latency_ms=0):
+        self.chat = type("Chat", (), {"id": chat_id})()
+        self.latency_ms = latency_ms
+        self.edits = []
+
+    async def edit_text(self, text, **kwargs):
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+        self.edits.append(text)
+
+
+class FakeCallback:
+    def __init__(self, data, message):
+        self.data = data
+        self.message = message
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+
+# 📏 Статистика по замерам
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def summarize(latencies, elapsed, pages=0, products=0, peak_kb=None):
+    return {
+        "iterations": len(latencies),
+        "elapsed_s": round(elapsed, 4),
+        "pages": pages,
+        "products": products,
+        "pages_per_s": round(pages / elapsed, 2) if elapsed else 0.0,
+        "products_per_s": round(products / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(_percentile(latencies, 50) * 1000, 3),
+            "p95": round(_percentile(latencies, 95) * 1000, 3),
+            "mean": round(statistics.fmean(latencies) * 1000, 3) if latencies else 0.0,
+            "max": round(max(latencies, default=0) * 1000, 3),
+        },
+        "peak_mem_kb": peak_kb,
+    }
+
+
+# 🧠 Пиковая память одного прогона (отдельно, tracemalloc сильно замедляет замеры)
+async def peak_memory_kb(func):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        await func()
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+# ⏱ Последовательные прогоны: func возвращает (страниц, товаров)
+async def run_sequential(func, iterations, warmup=1):
+    for _ in range(warmup):
+        await func()
+
+    latencies, pages, products = [], 0, 0
+    started = time.perf_counter()
+
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        p, n = await func()
+        latencies.append(time.perf_counter() - t0)
+        pages += p
+        products += n
+
+    elapsed = time.perf_counter() - started
+    return summarize(latencies, elapsed, pages, products, await peak_memory_kb(func))
+
+
+# 👥 Много пользователей одновременно: users задач по iterations запросов
+async def run_concurrent(func, users, iterations):
+    latencies, totals = [], [0, 0]
+
+    async def user(index):
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            p, n = await func(index)
+            latencies.append(time.perf_counter() - t0)
+            totals[0] += p
+            totals[1] += n
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user(i) for i in range(users)))
+    elapsed = time.perf_counter() - started
+
+    result = summarize(latencies, elapsed, *totals)
+    result["users"] = users
+    return result
+
+
+# 🧩 Сценарии
+def bench_parsers(iterations, scale):
+    html = _scale_html((FIXTURES / "category_page.html").read_text(encoding="utf-8"), scale)
+    results = {}
+
+    for name, backend in parsers.BACKENDS.items():
+        backend(html, "https://www.wildberries.ru")
+        latencies = []
+        products = 0
+        started = time.perf_counter()
+
+        for _ in range(iterations):
+            t0 = time.perf_counter()
+            products += len(backend(html, "https://www.wildberries.ru"))
+            latencies.append(time.perf_counter() - t0)
+
+        elapsed = time.perf_counter() - started
+
+        tracemalloc.start()
+        backend(html, "https://www.wildberries.ru")
+        peak = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        tracemalloc.stop()
+
+        results[f"parse:{name}"] = summarize(latencies, elapsed, iterations, products, peak)
+
+    return results
+
+
+async def bench_fetchers(base_url, args):
+    category_url = f"{base_url}/catalog/zhenshchinam"
+    results = {}
+
+    async def categories():
+        found = await monitor_playwright.fetch_categories_async()
+        return 1, len(found)
+
+    results["fetch_categories"] = await run_sequential(categories, args.iterations)
+
+    for source in ("html", "api"):
+        async def products(source=source):
+            monitor_playwright.WB_SOURCE = source
+            found = await monitor_playwright.fetch_products_for_category_async(category_url, args.pages)
+            return args.pages, len(found)
+
+        results[f"fetch_products_for_category:{source}"] = await run_sequential(products, args.iterations)
+
+    monitor_playwright.WB_SOURCE = args.source
+    return results
+
+
+async def bench_handler(base_url, args):
+    from redis.asyncio import Redis
+
+    redis = Redis.from_url(args.redis_url, decode_responses=True)
+    try:
+        await redis.ping()
+    except Exception as e:
+        await redis.aclose()
+        return {"category_handler": {"skipped": f"Redis недоступен ({args.redis_url}): {e!r}"}}
+
+    os.environ["REDIS_URL"] = args.redis_url
+    # bot.py печатает приветствие при импорте — stdout оставляем только для JSON-отчёта
+    with contextlib.redirect_stdout(sys.stderr):
+        import bot
+    import cache
+
+    bot.redis = redis
+    monitor_playwright.WB_SOURCE = args.source
+    category_url = f"{base_url}/catalog/zhenshchinam"
+    cache_key = f"{cache.CACHE_PREFIX}:products:1:{category_url}"
+
+    async def handle(chat_id=1, cold=True):
+        if cold:
+            await redis.delete(cache_key)
+        message = FakeMessage(chat_id, args.telegram_latency_ms)
+        await bot.category_handler(FakeCallback(f"category:{category_url}", message))
+        return 1 if cold else 0, message.edits[-1].count("🛍")
+
+    results = {
+        "category_handler:cold": await run_sequential(lambda: handle(cold=True), args.iterations),
+        "category_handler:warm": await run_sequential(lambda: handle(cold=False), args.iterations),
+        "category_handler:concurrent": await run_concurrent(
+            lambda i: handle(chat_id=i, cold=False), args.users, args.iterations,
+        ),
+    }
+
+    await redis.aclose()
+    return results
+
+
+# 🧑‍🤝‍🧑 Одновременные пользователи без Redis: прямой парсинг категории
+async def bench_concurrent_fetch(base_url, args):
+    category_url = f"{base_url}/catalog/zhenshchinam"
+    monitor_playwright.WB_SOURCE = args.source
+
+    async def user_request(index):
+        found = await monitor_playwright.fetch_products_for_category_async(category_url, args.pages)
+        return args.pages, len(found)
+
+    return {"fetch_products_for_category:concurrent": await run_concurrent(user_request, args.users, args.iterations)}
+
+
+# 📉 Сравнение с прошлым прогоном: p95 и пропускная способность
+def compare(current, baseline, tolerance):
+    regressions = []
+
+    for name, result in current["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old or "latency_ms" not in old or "latency_ms" not in result:
+            continue
+
+        old_p95, new_p95 = old["latency_ms"]["p95"], result["latency_ms"]["p95"]
+        if old_p95 and new_p95 > old_p95 * (1 + tolerance):
+            regressions.append(f"{name}: p95 {old_p95} -> {new_p95} мс")
+
+        old_rate, new_rate = old["products_per_s"], result["products_per_s"]
+        if old_rate and new_rate < old_rate * (1 - tolerance):
+            regressions.append(f"{name}: товаров/с {old_rate} -> {new_rate}")
+
+    return regressions
+
+
+async def main(args):
+    runner, base_url = await start_mock_server(
+        args.port, scale=args.scale, latency_ms=args.server_latency_ms, pages=args.pages,
+    )
+
+    try:
+        if args.serve:
+            print(f"🧪 Мок-сервер Wildberries: {base_url}")
+            await asyncio.Event().wait()
+
+        scenarios = bench_parsers(args.iterations, args.scale)
+        scenarios.update(await bench_fetchers(base_url, args))
+        scenarios.update(await bench_concurrent_fetch(base_url, args))
+        scenarios.update(await bench_handler(base_url, args))
+    finally:
+        await fetcher.close_session()
+        await runner.cleanup()
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "parser": parsers.WB_PARSER,
+            "parsers": sorted(parsers.BACKENDS),
+            "source": args.source,
+            "json": wb_api.json_loads.__module__,
+            "iterations": args.iterations,
+            "users": args.users,
+            "pages": args.pages,
+            "scale": args.scale,
+            "server_latency_ms": args.server_latency_ms,
+            "telegram_latency_ms": args.telegram_latency_ms,
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        },
+        "scenarios": scenarios,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк парсера и бота")
+    parser.add_argument("--iterations", type=int, default=20, help="прогонов на сценарий")
+    parser.add_argument("--users", type=int, default=50, help="одновременных пользователей")
+    parser.add_argument("--pages", type=int, default=3, help="страниц категории на запрос")
+    parser.add_argument("--scale", type=int, default=25, help="во сколько раз размножить карточки на странице")
+    parser.add_argument("--source", choices=("api", "html"), default="api", help="источник товаров для бота")
+    parser.add_argument("--server-latency-ms", type=float, default=0, help="задержка ответа мок-сервера")
+    parser.add_argument("--telegram-latency-ms", type=float, default=0, help="задержка фейкового edit_text")
+    parser.add_argument("--redis-url", default=os.getenv("BENCH_REDIS_URL", "redis://localhost:6379/15"))
+    parser.add_argument("--port", type=int, default=0, help="порт мок-сервера (0 — любой свободный)")
+    parser.add_argument("--output", help="куда сохранить JSON (по умолчанию stdout)")
+    parser.add_argument("--compare", help="JSON прошлого прогона для поиска регрессий")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое ухудшение (0.2 = 20%%)")
+    parser.add_argument("--serve", action="store_true", help="только поднять мок-сервер")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    report = asyncio.run(main(args))
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+
+    if args.output:
+        Path(args.output).write_text(output, encoding="utf-8")
+    else:
+        print(output)
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare(report, baseline, args.tolerance)
+
+        for line in regressions:
+            print(f"❌ {line}", file=sys.stderr)
+
+        sys.exit(1 if regressions else 0)
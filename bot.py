@@ -1,13 +1,25 @@
 import asyncio
+import json
 import logging
 import os
+import secrets
+from urllib.parse import urlsplit
 
 from aiogram import Bot, Dispatcher, F
-from aiogram.filters import CommandStart
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject, CommandStart
 from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup, InlineKeyboardButton
 from redis.asyncio import Redis
 
-from monitor_playwright import fetch_categories, fetch_products_for_category
+import metrics
+from fetcher import close_session
+from cache import get_categories, get_products
+from crawler import query_index
+from products import from_record, to_record
+from alerts import (
+    category_by_key, format_item, get_thresholds, list_subscriptions, remember_category,
+    run_alerts, set_thresholds, subscribe, unsubscribe,
+)
 
 # 🚀 Стартовое сообщение в логи
 print("🚀 Бот запущен")
@@ -17,6 +29,10 @@ BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 REDIS_URL = os.getenv("REDIS_URL")
 BONUS_MIN_PCT = int(os.getenv("BONUS_MIN_PCT", 20))
 BONUS_MIN_RUB = int(os.getenv("BONUS_MIN_RUB", 200))
+PAGE_SIZE = 10
+RESULTS_LIMIT = int(os.getenv("RESULTS_LIMIT", 200))
+RESULTS_TTL = int(os.getenv("RESULTS_TTL", 1800))
+RESULTS_PREFIX = "wb:res"
 
 # 📦 Redis
 redis = Redis.from_url(REDIS_URL, decode_responses=True)
@@ -29,7 +45,7 @@ dp = Dispatcher()
 
 # 🔘 Клавиатура категорий
 async def get_keyboard():
-    categories = fetch_categories()
+    categories = await get_categories(redis)
     if not categories:
         return InlineKeyboardMarkup(inline_keyboard=[[InlineKeyboardButton(text="❌ Категории не найдены", callback_data="none")]])
     buttons = [
@@ -43,45 +59,194 @@ async def get_keyboard():
 @dp.message(CommandStart())
 async def cmd_start(message: Message):
     print("📥 Получена команда /start")
-    kb = await get_keyboard()
-    await message.answer("👋 Выберите категорию для поиска товаров с бонусами за отзыв:", reply_markup=kb)
+    with metrics.HANDLER_SECONDS.time(handler="start"):
+        kb = await get_keyboard()
+        await message.answer("👋 Выберите категорию для поиска товаров с бонусами за отзыв:", reply_markup=kb)
+
+
+# 📄 Страница результатов и кнопки навигации
+async def render_page(token, category_key, page):
+    total = await redis.llen(f"{RESULTS_PREFIX}:{token}")
+    pages = max((total + PAGE_SIZE - 1) // PAGE_SIZE, 1)
+    page = min(max(page, 0), pages - 1)
+
+    rows = await redis.lrange(f"{RESULTS_PREFIX}:{token}", page * PAGE_SIZE, (page + 1) * PAGE_SIZE - 1)
+
+    buttons = []
+    if pages > 1:
+        buttons.append([
+            InlineKeyboardButton(text="◀️", callback_data=f"page:{token}:{category_key}:{page - 1}"),
+            InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data="none"),
+            InlineKeyboardButton(text="▶️", callback_data=f"page:{token}:{category_key}:{page + 1}"),
+        ])
+    buttons.append([InlineKeyboardButton(text="🔔 Уведомлять о новых товарах", callback_data=f"sub:{category_key}")])
+
+    text = f"🎯 Найденные товары ({total}):\n\n"
+    for row in rows:
+        text += format_item(from_record(json.loads(row)))
+
+    return text, InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+# ✏️ Редактирование сообщения с замером времени ответа Telegram
+async def edit_text(message, text, **kwargs):
+    with metrics.TELEGRAM_SECONDS.time(method="edit_text"):
+        return await message.edit_text(text, **kwargs)
 
 
 # 📦 Обработка выбора категории
 @dp.callback_query(F.data.startswith("category:"))
 async def category_handler(callback: CallbackQuery):
+    with metrics.HANDLER_SECONDS.time(handler="category"), metrics.profile_slow("category_handler"):
+        await _category_handler(callback)
+
+
+async def _category_handler(callback: CallbackQuery):
     url = callback.data.split(":", 1)[1]
-    await callback.message.edit_text("🔎 Ищу товары, подождите...")
+    category = urlsplit(url).path
+    await edit_text(callback.message, "🔎 Ищу товары, подождите...")
 
     try:
-        items = fetch_products_for_category(url)
+        # Сначала индекс фонового обходчика, если категории в нём нет — парсим
+        #   В список результатов идут компактные записи, словари собираются только для страницы
+        items = await query_index(redis, url, BONUS_MIN_PCT, BONUS_MIN_RUB, limit=RESULTS_LIMIT)
+
+        if items is None:
+            metrics.CATEGORY_REQUESTS.inc(category=category, source="scrape")
+            table = await get_products(redis, url)
+            with metrics.FILTER_SECONDS.time():
+                ranked = [table.record(i) for i in table.top(BONUS_MIN_PCT, BONUS_MIN_RUB, limit=RESULTS_LIMIT)]
+        else:
+            metrics.CATEGORY_REQUESTS.inc(category=category, source="index")
+            ranked = [to_record(item) for item in items]
 
-        filtered = [
-            item for item in items
-            if item["bonus"] >= BONUS_MIN_RUB and (item["bonus"] / item["price"]) * 100 >= BONUS_MIN_PCT
-        ]
+        metrics.CATEGORY_PRODUCTS.inc(len(ranked), category=category)
+        key = await remember_category(redis, url)
 
-        if not filtered:
-            await callback.message.edit_text("❌ Подходящих товаров не найдено.")
-        else:
-            text = "🎯 Найденные товары:\n\n"
-            for item in filtered[:10]:  # максимум 10 товаров
-                text += (
-                    f"🛍 <b>{item['name']}</b>\n"
-                    f"💰 Цена: {item['price']} ₽\n"
-                    f"🎁 Бонус: {item['bonus']} ₽\n"
-                    f"🔗 <a href='{item['url']}'>Смотреть</a>\n\n"
-                )
-            await callback.message.edit_text(text, parse_mode="HTML")
+        if not ranked:
+            kb = InlineKeyboardMarkup(inline_keyboard=[
+                [InlineKeyboardButton(text="🔔 Уведомлять о новых товарах", callback_data=f"sub:{key}")]
+            ])
+            await edit_text(callback.message, "❌ Подходящих товаров не найдено.", reply_markup=kb)
+            return
+
+        # Отранжированный список сохраняется — листание не повторяет парсинг и фильтр
+        token = secrets.token_hex(4)
+        pipe = redis.pipeline()
+        pipe.rpush(f"{RESULTS_PREFIX}:{token}", *(json.dumps(record, ensure_ascii=False) for record in ranked))
+        pipe.expire(f"{RESULTS_PREFIX}:{token}", RESULTS_TTL)
+        await pipe.execute()
+
+        text, kb = await render_page(token, key, 0)
+        await edit_text(callback.message, text, parse_mode="HTML", reply_markup=kb, disable_web_page_preview=True)
 
     except Exception as e:
+        metrics.HANDLER_ERRORS.inc(handler="category")
         logging.exception("❗ Ошибка при парсинге товаров")
-        await callback.message.edit_text("⚠️ Произошла ошибка при поиске. Попробуйте позже.")
+        await edit_text(callback.message, "⚠️ Произошла ошибка при поиске. Попробуйте позже.")
+
+
+# ↔️ Листание результатов
+@dp.callback_query(F.data.startswith("page:"))
+async def page_handler(callback: CallbackQuery):
+    _, token, category_key, page = callback.data.split(":")
+
+    if not await redis.exists(f"{RESULTS_PREFIX}:{token}"):
+        await callback.answer("⌛ Результаты устарели, выберите категорию заново через /start")
+        return
+
+    text, kb = await render_page(token, category_key, int(page))
+    await callback.answer()
+
+    try:
+        await edit_text(callback.message, text, parse_mode="HTML", reply_markup=kb, disable_web_page_preview=True)
+    except TelegramBadRequest:
+        # Крайняя страница — текст не изменился
+        pass
+
+
+# 🔔 Подписка на категорию
+@dp.callback_query(F.data.startswith("sub:"))
+async def subscribe_handler(callback: CallbackQuery):
+    url = await category_by_key(redis, callback.data.split(":", 1)[1])
+    if not url:
+        await callback.answer("⚠️ Категория не найдена, откройте её заново через /start")
+        return
+
+    await subscribe(redis, callback.message.chat.id, url)
+    min_pct, min_rub = await get_thresholds(redis, callback.message.chat.id)
+    await callback.answer(f"🔔 Подписка оформлена: бонус от {min_pct}% и от {min_rub} ₽")
+
+
+# 🔕 Отписка от категории
+@dp.callback_query(F.data.startswith("unsub:"))
+async def unsubscribe_handler(callback: CallbackQuery):
+    url = await category_by_key(redis, callback.data.split(":", 1)[1])
+    if url:
+        await unsubscribe(redis, callback.message.chat.id, url)
+
+    await callback.answer("🔕 Подписка отменена")
+    await callback.message.edit_reply_markup(reply_markup=await get_subscriptions_keyboard(callback.message.chat.id))
+
+
+async def get_subscriptions_keyboard(chat_id):
+    buttons = []
+    for url in await list_subscriptions(redis, chat_id):
+        key = await remember_category(redis, url)
+        buttons.append([InlineKeyboardButton(text=f"❌ {url.rstrip('/').rsplit('/', 1)[-1]}", callback_data=f"unsub:{key}")])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
+# 📋 Список подписок: /subs
+@dp.message(Command("subs"))
+async def cmd_subs(message: Message):
+    min_pct, min_rub = await get_thresholds(redis, message.chat.id)
+    kb = await get_subscriptions_keyboard(message.chat.id)
+
+    if not kb.inline_keyboard:
+        await message.answer("🔕 Подписок нет. Выберите категорию через /start и нажмите «Уведомлять».")
+        return
+
+    await message.answer(
+        f"🔔 Ваши подписки (бонус от {min_pct}% и от {min_rub} ₽).\nНажмите, чтобы отписаться:",
+        reply_markup=kb,
+    )
+
+
+# 🎚 Пороги уведомлений: /threshold 20 200
+@dp.message(Command("threshold"))
+async def cmd_threshold(message: Message, command: CommandObject):
+    try:
+        min_pct, min_rub = (int(value) for value in (command.args or "").split())
+    except ValueError:
+        min_pct, min_rub = await get_thresholds(redis, message.chat.id)
+        await message.answer(f"ℹ️ Сейчас: от {min_pct}% и от {min_rub} ₽.\nФормат: /threshold <процент> <рубли>")
+        return
+
+    await set_thresholds(redis, message.chat.id, min_pct, min_rub)
+    await message.answer(f"✅ Уведомлять о товарах с бонусом от {min_pct}% и от {min_rub} ₽")
 
 
 # 🚀 Запуск бота
 async def main():
-    await dp.start_polling(bot)
+    dp.shutdown.register(close_session)
+    metrics_runner = None
+
+    if metrics.METRICS_PORT:
+        try:
+            metrics_runner = await metrics.start_metrics_server()
+        except OSError as e:
+            # Порт занят или недоступен — бот работает и без /metrics
+            logging.error("📈 Не удалось запустить сервер метрик: %s", repr(e))
+
+    alerts_task = asyncio.create_task(run_alerts(bot, redis))
+
+    try:
+        await dp.start_polling(bot)
+    finally:
+        alerts_task.cancel()
+        if metrics_runner:
+            await metrics_runner.cleanup()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+import metrics
+from monitor_playwright import fetch_categories_async, fetch_products_for_category_async
+from products import ProductTable
+
+# 🗄 Кэш категорий и товаров в Redis: TTL, stale-while-revalidate и склейка запросов
+
+CACHE_PREFIX = "wb:cache"
+CATEGORIES_TTL = int(os.getenv("CACHE_CATEGORIES_TTL", 6 * 3600))
+PRODUCTS_TTL = int(os.getenv("CACHE_PRODUCTS_TTL", 600))
+# Сколько ещё секунд после TTL можно отдавать устаревшие данные, пока идёт обновление
+STALE_TTL = int(os.getenv("CACHE_STALE_TTL", 3600))
+
+# Запросы, которые сейчас выполняются: ключ кэша -> asyncio.Task
+_inflight = {}
+
+
+# 🔁 Один запрос на ключ: все одновременные вызовы ждут одну и ту же задачу
+def _coalesce(key, factory):
+    task = _inflight.get(key)
+
+    if task is None:
+        task = asyncio.create_task(factory())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+
+    return task
+
+
+def _same(value):
+    return value
+
+
+# 💾 Загрузка данных и запись в Redis (пустой результат = ошибка парсинга, не кэшируем)
+async def _refresh(redis, key, loader, ttl, dump):
+    value = await loader()
+
+    if value:
+        payload = json.dumps({"ts": time.time(), "data": dump(value)}, ensure_ascii=False)
+        try:
+            await redis.set(key, payload, ex=ttl + STALE_TTL)
+        except Exception as e:
+            logging.warning("[cache] Не удалось записать %s: %s", key, repr(e))
+
+    return value
+
+
+# 🧾 Запись из Redis -> (время, данные), None — записи нет или она битая / старого формата
+def _decode(key, raw, load):
+    if raw is None:
+        return None
+
+    try:
+        entry = json.loads(raw)
+        return float(entry["ts"]), load(entry["data"])
+    except (ValueError, TypeError, KeyError) as e:
+        logging.warning("[cache] Не удалось прочитать %s: %s", key, repr(e))
+        return None
+
+
+# 📦 Чтение через кэш (fresh=True — устаревшее не отдаём, ждём обновления)
+#   dump/load переводят значение в JSON-совместимый вид и обратно
+async def _cached(redis, kind, key, loader, ttl, fresh=False, dump=_same, load=_same):
+    try:
+        raw = await redis.get(key)
+    except Exception as e:
+        logging.warning("[cache] Redis недоступен: %s", repr(e))
+        raw = None
+
+    entry = _decode(key, raw, load)
+
+    if entry is not None and time.time() - entry[0] <= ttl:
+        metrics.CACHE_REQUESTS.inc(kind=kind, result="hit")
+        return entry[1]
+
+    if entry is not None and not fresh:
+        # Данные устарели — отдаём их сразу, обновление идёт в фоне
+        metrics.CACHE_REQUESTS.inc(kind=kind, result="stale")
+        _coalesce(key, lambda: _refresh(redis, key, loader, ttl, dump))
+        return entry[1]
+
+    metrics.CACHE_REQUESTS.inc(kind=kind, result="miss")
+
+    # asyncio.shield — отмена одного ожидающего не отменяет общий запрос
+    return await asyncio.shield(_coalesce(key, lambda: _refresh(redis, key, loader, ttl, dump)))
+
+
+# 📁 Категории через кэш
+async def get_categories(redis):
+    return await _cached(redis, "categories", f"{CACHE_PREFIX}:categories", fetch_categories_async, CATEGORIES_TTL)
+
+
+# 🛍 Товары категории через кэш — ProductTable, в Redis хранятся её колонки
+async def get_products(redis, category_url, max_pages=1, fresh=False):
+    key = f"{CACHE_PREFIX}:products:{max_pages}:{category_url}"
+
+    async def load_table():
+        return ProductTable.from_dicts(await fetch_products_for_category_async(category_url, max_pages))
+
+    return await _cached(
+        redis, "products", key, load_table, PRODUCTS_TTL,
+        fresh=fresh, dump=ProductTable.columns, load=ProductTable.from_columns,
+    )
@@ -0,0 +1,207 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+
+from redis.asyncio import Redis
+
+from fetcher import close_session
+from monitor_playwright import fetch_categories_async, fetch_products_page_async
+
+# 🕷 Фоновый обходчик: индексирует все категории, бот отвечает из индекса
+
+REDIS_URL = os.getenv("REDIS_URL")
+CRAWL_INTERVAL = int(os.getenv("CRAWL_INTERVAL", 1800))
+CRAWL_MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", 10))
+CRAWL_WORKERS = int(os.getenv("CRAWL_WORKERS", 4))
+CRAWL_RPS = float(os.getenv("CRAWL_RPS", 2))
+# Индекс старше этого возраста считается протухшим, бот идёт в обычный парсинг
+INDEX_MAX_AGE = int(os.getenv("INDEX_MAX_AGE", 24 * 3600))
+# Сколько товаров индекса читается за один запрос к Redis (но не меньше запрошенного limit)
+INDEX_QUERY_CHUNK = int(os.getenv("INDEX_QUERY_CHUNK", 200))
+
+INDEX_PREFIX = "wb:idx"
+CYCLE_KEY = f"{INDEX_PREFIX}:cycle"
+PROGRESS_KEY = f"{INDEX_PREFIX}:progress"
+UPDATED_KEY = f"{INDEX_PREFIX}:updated"
+
+
+# 🔑 Ключи индекса категории: товары (hash url -> json) и бонус в % (zset url -> pct)
+def _index_keys(category_url, cycle=None):
+    base = f"{INDEX_PREFIX}:stage:{cycle}" if cycle is not None else INDEX_PREFIX
+    return f"{base}:{category_url}:items", f"{base}:{category_url}:pct"
+
+
+# 📐 Процент бонуса от цены — считается один раз при индексации
+def bonus_pct(item):
+    if item["price"] <= 0:
+        return 0.0
+    return item["bonus"] / item["price"] * 100
+
+
+# 🚦 Ограничение частоты запросов общее для всех воркеров
+class RateLimiter:
+    def __init__(self, rps):
+        self.interval = 1 / rps if rps > 0 else 0
+        self.next_at = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_at - now
+            self.next_at = max(now, self.next_at) + self.interval
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+# 🔎 Товары из индекса с бонусом не ниже порогов (по убыванию %), None — индекса нет
+#   zset читается кусками: как только набралось limit товаров с нужным бонусом в рублях, стоп
+async def query_index(redis, category_url, min_pct, min_rub, limit=None):
+    chunk = max(limit or 0, INDEX_QUERY_CHUNK)
+    items_key, pct_key = _index_keys(category_url)
+    result = []
+
+    try:
+        updated = await redis.hget(UPDATED_KEY, category_url)
+        if updated is None or time.time() - float(updated) > INDEX_MAX_AGE:
+            return None
+
+        for start in itertools.count(0, chunk):
+            urls = await redis.zrevrangebyscore(pct_key, "+inf", min_pct, start=start, num=chunk)
+            if not urls:
+                break
+
+            for row in await redis.hmget(items_key, urls):
+                if row is None:
+                    continue
+
+                item = json.loads(row)
+                if item["bonus"] >= min_rub:
+                    result.append(item)
+                    if limit and len(result) >= limit:
+                        return result
+
+            if len(urls) < chunk:
+                break
+
+    except Exception as e:
+        logging.warning("[query_index] Индекс недоступен: %s", repr(e))
+        return None
+
+    return result
+
+
+# 📄 Обход одной категории с продолжением с последней сохранённой страницы
+async def crawl_category(redis, limiter, cycle, name, category_url):
+    progress = await redis.hget(PROGRESS_KEY, category_url)
+    start = 1
+
+    if progress and progress.startswith(f"{cycle}:"):
+        done = progress.split(":", 1)[1]
+        if done == "done":
+            return
+        start = int(done) + 1
+
+    items_key, pct_key = _index_keys(category_url, cycle)
+    total = 0
+
+    for page in range(start, CRAWL_MAX_PAGES + 1):
+        await limiter.wait()
+        items = await fetch_products_page_async(category_url, page)
+
+        if items is None:
+            # Ошибка загрузки — прогресс сохранён, живой индекс не трогаем
+            logging.warning(f"[crawl] {name}: не удалось получить страницу {page}, категория отложена")
+            return
+
+        if not items:
+            break
+
+        pipe = redis.pipeline()
+        pipe.hset(items_key, mapping={
+            item["url"]: json.dumps(item, ensure_ascii=False) for item in items
+        })
+        pipe.zadd(pct_key, {item["url"]: bonus_pct(item) for item in items})
+        pipe.hset(PROGRESS_KEY, category_url, f"{cycle}:{page}")
+        # Брошенные промежуточные ключи (упавший проход) не копятся вечно
+        pipe.expire(items_key, INDEX_MAX_AGE)
+        pipe.expire(pct_key, INDEX_MAX_AGE)
+        await pipe.execute()
+        total += len(items)
+
+    # Пустая первая страница — скорее всего ошибка, старый индекс не трогаем
+    if not await redis.exists(items_key):
+        logging.warning(f"[crawl] Нет товаров в категории {name}, индекс не обновлён")
+    else:
+        live_items_key, live_pct_key = _index_keys(category_url)
+        pipe = redis.pipeline()
+        pipe.rename(items_key, live_items_key)
+        pipe.rename(pct_key, live_pct_key)
+        pipe.persist(live_items_key)
+        pipe.persist(live_pct_key)
+        pipe.hset(UPDATED_KEY, category_url, time.time())
+        await pipe.execute()
+
+    await redis.hset(PROGRESS_KEY, category_url, f"{cycle}:done")
+    logging.info(f"[crawl] {name}: проиндексировано товаров {total}")
+
+
+# 👷 Воркер забирает категории из очереди
+async def _worker(redis, limiter, cycle, queue):
+    while True:
+        name, category_url = await queue.get()
+        try:
+            await crawl_category(redis, limiter, cycle, name, category_url)
+        except Exception as e:
+            logging.error("[crawl] Ошибка в категории %s: %s", name, repr(e))
+        finally:
+            queue.task_done()
+
+
+# 🔁 Один полный проход по всем категориям
+async def crawl_cycle(redis, limiter):
+    # В ключе номер последнего завершённого прохода
+    cycle = int(await redis.get(CYCLE_KEY) or 0) + 1
+    categories = await fetch_categories_async()
+
+    if not categories:
+        logging.error("[crawl] Категории не получены, проход пропущен")
+        return
+
+    logging.info(f"[crawl] Проход #{cycle}: категорий {len(categories)}")
+
+    queue = asyncio.Queue()
+    for name, category_url in categories.items():
+        queue.put_nowait((name, category_url))
+
+    workers = [
+        asyncio.create_task(_worker(redis, limiter, cycle, queue))
+        for _ in range(CRAWL_WORKERS)
+    ]
+    await queue.join()
+
+    for worker in workers:
+        worker.cancel()
+
+    await redis.incr(CYCLE_KEY)
+    logging.info(f"[crawl] Проход #{cycle} завершён")
+
+
+# 🚀 Запуск обходчика по расписанию
+async def main(once=False):
+    redis = Redis.from_url(REDIS_URL, decode_responses=True)
+    limiter = RateLimiter(CRAWL_RPS)
+
+    try:
+        while True:
+            await crawl_cycle(redis, limiter)
+            if once:
+                break
+            await asyncio.sleep(CRAWL_INTERVAL)
+    finally:
+        await close_session()
+        await redis.aclose()
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import os
+import random
+import time
+from urllib.parse import urlsplit
+
+import aiohttp
+
+import metrics
+from proxy_pool import ProxyPool, load_proxies
+
+# 🌐 Асинхронный HTTP-слой: общий пул соединений, keep-alive и лимиты на хост
+
+# 📦 Заголовки максимально приближенные к реальному браузеру
+HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+        "AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/120.0.0.0 Safari/537.36"
+    ),
+    "Accept": (
+        "text/html,application/xhtml+xml,application/xml;"
+        "q=0.9,image/avif,image/webp,*/*;q=0.8"
+    ),
+    "Accept-Encoding": "gzip, deflate, br",
+    "Accept-Language": "ru,en;q=0.9",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1"
+}
+
+# ⚙️ Настройки пула соединений
+HTTP_TIMEOUT = float(os.getenv("WB_HTTP_TIMEOUT", 15))
+POOL_SIZE = int(os.getenv("WB_POOL_SIZE", 100))
+HOST_CONCURRENCY = int(os.getenv("WB_HOST_CONCURRENCY", 8))
+KEEPALIVE_TIMEOUT = float(os.getenv("WB_KEEPALIVE_TIMEOUT", 30))
+
+# 🔁 Повторы с экспоненциальной паузой и случайным разбросом
+WB_RETRIES = int(os.getenv("WB_RETRIES", 3))
+WB_BACKOFF_BASE = float(os.getenv("WB_BACKOFF_BASE", 1.2))
+WB_BACKOFF_MAX = float(os.getenv("WB_BACKOFF_MAX", 30))
+RETRY_STATUSES = {None, 403, 429, 500, 502, 503, 504}
+
+# 🚦 Адаптивный лимит запросов в секунду на хост
+WB_RATE = float(os.getenv("WB_RATE", 5))
+WB_MIN_RATE = float(os.getenv("WB_MIN_RATE", 0.5))
+WB_MAX_RATE = float(os.getenv("WB_MAX_RATE", 20))
+WB_RATE_STEP = float(os.getenv("WB_RATE_STEP", 0.1))
+WB_BURST = float(os.getenv("WB_BURST", 5))
+
+# 🛡 Прокси из переменных окружения или файла
+proxy_pool = ProxyPool(load_proxies())
+
+if proxy_pool.proxies[0].url:
+    logging.info(f"🌐 Используется прокси: {len(proxy_pool)} шт.")
+
+_session = None
+_host_limits = {}
+_rate_limits = {}
+
+
+# 🪣 Token bucket с AIMD: успех плавно ускоряет, 429/403/5xx — вдвое замедляет
+class AdaptiveLimiter:
+    def __init__(self, rate=WB_RATE, min_rate=WB_MIN_RATE, max_rate=WB_MAX_RATE, burst=WB_BURST):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.next_at = 0.0
+        self.last_decrease = 0.0
+
+    async def acquire(self):
+        now = time.monotonic()
+        # Простой не копит больше burst запросов «впрок»
+        self.next_at = max(self.next_at, now - self.burst / self.rate)
+        delay = self.next_at - now
+        self.next_at += 1 / self.rate
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def on_success(self):
+        self.rate = min(self.max_rate, self.rate + WB_RATE_STEP)
+
+    def on_throttle(self):
+        # Пачка ошибок от одновременных запросов снижает темп один раз, а не N
+        now = time.monotonic()
+        if now - self.last_decrease >= 1.0:
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.last_decrease = now
+            logging.info(f"[fetch] Темп снижен до {self.rate:.2f} запр/с")
+
+
+# 🔌 Общая сессия на текущий event loop
+async def get_session():
+    global _session
+
+    if _session is None or _session.closed:
+        # Лимит на хост держит семафор _host_limit: он считает запросы к домену через все прокси,
+        #   а limit_per_host коннектора — отдельно для каждого прокси
+        connector = aiohttp.TCPConnector(
+            limit=POOL_SIZE,
+            keepalive_timeout=KEEPALIVE_TIMEOUT,
+            ttl_dns_cache=300,
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            headers=HEADERS,
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT),
+        )
+
+    return _session
+
+
+# 🧹 Закрытие сессии (при остановке бота или в конце синхронного вызова)
+#   Семафоры и темп хостов сбрасываются: следующий run_sync начинает с чистого состояния
+async def close_session():
+    global _session
+
+    if _session is not None and not _session.closed:
+        await _session.close()
+
+    _session = None
+    _host_limits.clear()
+    _rate_limits.clear()
+
+
+# 🚦 Семафор на хост — ограничивает одновременные запросы к одному домену
+def _host_limit(url):
+    host = urlsplit(url).netloc
+
+    if host not in _host_limits:
+        _host_limits[host] = asyncio.Semaphore(HOST_CONCURRENCY)
+
+    return _host_limits[host]
+
+
+def _rate_limit(url):
+    host = urlsplit(url).netloc
+
+    if host not in _rate_limits:
+        _rate_limits[host] = AdaptiveLimiter()
+
+    return _rate_limits[host]
+
+
+# 📥 GET-запрос с ротацией прокси и повторами:
+#   возвращает (код ответа, тело) или (None, None), если все попытки — сетевые ошибки
+#   или все прокси на охлаждении
+async def _get(url, params, read):
+    session = await get_session()
+    limiter = _rate_limit(url)
+    host = urlsplit(url).netloc
+    status, body = None, None
+
+    for attempt in range(WB_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(random.uniform(0, min(WB_BACKOFF_BASE * 2 ** (attempt - 1), WB_BACKOFF_MAX)))
+
+        proxy = proxy_pool.acquire()
+        wait = proxy_pool.wait_time(proxy)
+        if wait > min(WB_BACKOFF_BASE * 2 ** attempt, WB_BACKOFF_MAX):
+            # Все прокси на охлаждении дольше паузы попытки — через забаненный не идём,
+            #   вызывающий переключится на запасной путь
+            logging.warning(f"[fetch] {url}: все прокси на охлаждении ещё {wait:.0f} с")
+            metrics.FETCH_REQUESTS.inc(host=host, status="cooldown")
+            return status, body
+        if wait:
+            # Ближайший прокси остынет за паузу этой попытки — ждём его
+            await asyncio.sleep(wait)
+
+        await limiter.acquire()
+        started = time.monotonic()
+
+        async with _host_limit(url):
+            try:
+                async with session.get(url, params=params, proxy=proxy.url) as resp:
+                    status = resp.status
+                    body = await read(resp)
+                    # Content-Length — размер по сети (сжатый); без него — декодированное тело,
+                    #   которое aiohttp уже держит после чтения, повторного скачивания нет
+                    size = resp.content_length
+                    if size is None:
+                        size = len(await resp.read())
+                    metrics.FETCH_BYTES.inc(size, host=host)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logging.warning("[fetch] Ошибка запроса %s через %s: %s", url, proxy.label, repr(e))
+                status, body = None, None
+
+        elapsed = time.monotonic() - started
+        proxy_pool.report(proxy, status, elapsed)
+        metrics.FETCH_SECONDS.observe(elapsed, host=host)
+        metrics.FETCH_REQUESTS.inc(host=host, status=status or "error")
+
+        if status not in RETRY_STATUSES:
+            limiter.on_success()
+            return status, body
+
+        limiter.on_throttle()
+        logging.warning(f"[fetch] {url}: код {status}, попытка {attempt + 1}/{WB_RETRIES + 1}")
+
+    return status, body
+
+
+async def fetch_text(url, params=None):
+    return await _get(url, params, lambda resp: resp.text())
+
+
+# 📥 Сырые байты — для JSON, который декодируется без промежуточной строки
+async def fetch_bytes(url, params=None):
+    return await _get(url, params, lambda resp: resp.read())
+
+
+# 🔁 Запуск корутины из синхронного кода с закрытием сессии в конце
+def run_sync(coro):
+    async def runner():
+        try:
+            return await coro
+        finally:
+            await close_session()
+
+    return asyncio.run(runner())
@@ -0,0 +1,189 @@
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from aiohttp import web
+
+# 📈 Метрики в формате Prometheus и профилирование медленных запросов
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+# Эндпоинт /metrics включается явно: METRICS_PORT=0 — выключен
+#   (9100 не по умолчанию — это порт node_exporter), слушает только localhost, пока не задан METRICS_HOST
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# Профилировать долю запросов (0 — выключено) и печатать отчёт, если дольше порога
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0))
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", 2000))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+REGISTRY = []
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    pairs += [f'{n}="{_escape(v)}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+# Значения обновляются и из потоков asyncio.to_thread (разбор HTML), поэтому под замком
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            lines += self._samples()
+        return "\n".join(lines)
+
+
+# ➕ Счётчик
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def _samples(self):
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {value}"
+            for key, value in self.values.items()
+        ]
+
+
+# ⏱ Гистограмма длительностей
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+
+        with self.lock:
+            state = self.values.get(key)
+
+            if state is None:
+                state = self.values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state["counts"][i] += 1
+
+            state["sum"] += value
+            state["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self):
+        lines = []
+
+        for key, state in self.values.items():
+            for bound, count in zip(self.buckets, state["counts"]):
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', bound)])} {count}")
+
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', '+Inf')])} {state['count']}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {state['sum']}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state['count']}")
+
+        return lines
+
+
+# 📋 Метрики бота
+FETCH_SECONDS = Histogram("wb_fetch_seconds", "HTTP request latency", ["host"])
+FETCH_REQUESTS = Counter("wb_fetch_requests_total", "HTTP requests by status", ["host", "status"])
+FETCH_BYTES = Counter("wb_fetch_bytes_total", "Response bytes: Content-Length, or decoded body size when it is absent", ["host"])
+PARSE_SECONDS = Histogram("wb_parse_seconds", "HTML/JSON parsing time", ["kind"])
+FILTER_SECONDS = Histogram("wb_filter_seconds", "Product filtering and ranking time")
+TELEGRAM_SECONDS = Histogram("wb_telegram_seconds", "Telegram API call latency", ["method"])
+HANDLER_SECONDS = Histogram("wb_handler_seconds", "Bot handler latency", ["handler"])
+HANDLER_ERRORS = Counter("wb_handler_errors_total", "Bot handler errors", ["handler"])
+CACHE_REQUESTS = Counter("wb_cache_requests_total", "Cache lookups by result (hit/stale/miss)", ["kind", "result"])
+CATEGORY_REQUESTS = Counter("wb_category_requests_total", "Category lookups by source (index/scrape)", ["category", "source"])
+CATEGORY_PRODUCTS = Counter("wb_category_products_total", "Products found per category", ["category"])
+
+
+def render():
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# 🌐 HTTP-эндпоинт /metrics рядом с поллингом бота
+async def _metrics_handler(request):
+    return web.Response(text=render(), content_type="text/plain", charset="utf-8")
+
+
+async def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics_handler)
+
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+
+    try:
+        await web.TCPSite(runner, host, port).start()
+    except OSError:
+        await runner.cleanup()
+        raise
+
+    logging.info(f"📈 Метрики доступны на {host}:{port}/metrics")
+    return runner
+
+
+# 🔬 Семплирующий профайлер (pyinstrument) для доли запросов, отчёт — только для медленных
+_profiling = False
+
+
+@contextmanager
+def profile_slow(name):
+    global _profiling
+
+    if Profiler is None or _profiling or random.random() >= PROFILE_SAMPLE_RATE:
+        yield
+        return
+
+    _profiling = True
+    profiler = Profiler(async_mode="enabled")
+    profiler.start()
+    started = time.perf_counter()
+
+    try:
+        yield
+    finally:
+        profiler.stop()
+        _profiling = False
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        if elapsed_ms >= PROFILE_SLOW_MS:
+            logging.warning(f"[profile] {name}: {elapsed_ms:.0f} мс\n{profiler.output_text(unicode=True)}")
@@ -1,56 +1,30 @@
-import os
+import asyncio
 import logging
-import requests
+import os
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 
+import metrics
+import parsers
+import wb_api
+from fetcher import fetch_text, run_sync
+
 # 🔧 Настройка логов
 logging.basicConfig(level=logging.INFO)
 
 # 🌍 Основные константы
 WB_BASE_URL = "https://www.wildberries.ru"
 WB_MAIN_CATALOG = f"{WB_BASE_URL}/catalog"
+# Источник товаров: api — JSON каталога (с откатом на HTML), html — только HTML
+WB_SOURCE = os.getenv("WB_SOURCE", "api")
 
-# 📦 Заголовки максимально приближенные к реальному браузеру
-HEADERS = {
-    "User-Agent": (
-        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-        "AppleWebKit/537.36 (KHTML, like Gecko) "
-        "Chrome/120.0.0.0 Safari/537.36"
-    ),
-    "Accept": (
-        "text/html,application/xhtml+xml,application/xml;"
-        "q=0.9,image/avif,image/webp,*/*;q=0.8"
-    ),
-    "Accept-Encoding": "gzip, deflate, br",
-    "Accept-Language": "ru,en;q=0.9",
-    "Connection": "keep-alive",
-    "Upgrade-Insecure-Requests": "1"
-}
-
-# 🛡 Поддержка прокси из переменных окружения
-PROXY_URL = os.getenv("PROXY_URL", "")
-PROXIES = {
-    "http": PROXY_URL,
-    "https": PROXY_URL
-} if PROXY_URL else None
-
-if PROXY_URL:
-    logging.info(f"🌐 Используется прокси: {PROXIES}")
 
-
-# 📁 Получение списка категорий
-def fetch_categories():
+# 📁 Разбор списка категорий из HTML каталога
+def parse_categories(html):
     categories = {}
 
-    try:
-        resp = requests.get(WB_MAIN_CATALOG, headers=HEADERS, proxies=PROXIES, timeout=15)
-
-        if resp.status_code != 200:
-            logging.error(f"[fetch_categories] Код ответа: {resp.status_code}")
-            return {}
-
-        soup = BeautifulSoup(resp.text, "html.parser")
+    with metrics.PARSE_SECONDS.time(kind="categories"):
+        soup = BeautifulSoup(html, "html.parser")
 
         for a in soup.select("a.menu-burger__main-list-link"):
             name = a.get_text(strip=True)
@@ -59,6 +33,29 @@ def fetch_categories():
             if name and href and href.startswith("/catalog"):
                 categories[name] = urljoin(WB_BASE_URL, href)
 
+    return categories
+
+
+# 📦 Разбор карточек товаров из HTML страницы категории (движок задаётся WB_PARSER)
+def parse_products(html):
+    with metrics.PARSE_SECONDS.time(kind="html"):
+        return parsers.parse_products(html, WB_BASE_URL)
+
+
+# 📁 Получение списка категорий
+async def fetch_categories_async():
+    categories = {}
+
+    try:
+        status, html = await fetch_text(WB_MAIN_CATALOG)
+
+        if status != 200:
+            logging.error(f"[fetch_categories] Код ответа: {status}")
+            return {}
+
+        # Разбор HTML — CPU-работа, уводим её из event loop
+        categories = await asyncio.to_thread(parse_categories, html)
+
         logging.info(f"[fetch_categories] Найдено категорий: {len(categories)}")
 
     except Exception as e:
@@ -67,50 +64,75 @@ def fetch_categories():
     return categories
 
 
-# 📦 Получение товаров из категории
-def fetch_products_for_category(category_url, max_pages=1):
-    products = []
+# 📄 Получение товаров с одной HTML-страницы категории, None — страницу получить не удалось
+async def _fetch_products_page_html(category_url, page):
+    url = f"{category_url}?page={page}"
 
     try:
-        for page in range(1, max_pages + 1):
-            url = f"{category_url}?page={page}"
-            resp = requests.get(url, headers=HEADERS, proxies=PROXIES, timeout=15)
+        status, html = await fetch_text(url)
+
+        if status != 200:
+            logging.warning(f"[fetch_products_for_category] Код ответа: {status} для страницы {url}")
+            return None
 
-            if resp.status_code != 200:
-                logging.warning(f"[fetch_products_for_category] Код ответа: {resp.status_code} для страницы {url}")
-                continue
+        return await asyncio.to_thread(parse_products, html)
 
-            soup = BeautifulSoup(resp.text, "html.parser")
+    except Exception as e:
+        logging.error("[fetch_products_for_category] Ошибка на странице %s: %s", url, repr(e))
+        return None
 
-            for card in soup.select("div.product-card"):
-                name_tag = card.select_one(".product-card__name")
-                price_tag = card.select_one(".price__lower-price")
-                bonus_tag = card.select_one(".product-card__bonus-percent")
-                link_tag = card.select_one("a")
 
-                if name_tag and price_tag and link_tag:
-                    name = name_tag.get_text(strip=True)
-                    price = int(price_tag.get_text(strip=True).replace("₽", "").replace(" ", ""))
-                    bonus = 0
+# 📄 Получение товаров с одной страницы категории (API, при неудаче — HTML)
+#   [] — страница получена, но товаров нет; None — ошибка загрузки
+async def fetch_products_page_async(category_url, page):
+    if WB_SOURCE == "api":
+        products = await wb_api.fetch_products_page_api(category_url, page)
+        if products is not None:
+            return products
 
-                    if bonus_tag:
-                        try:
-                            bonus = int("".join(filter(str.isdigit, bonus_tag.get_text(strip=True))))
-                        except ValueError:
-                            pass
+    return await _fetch_products_page_html(category_url, page)
 
-                    link = urljoin(WB_BASE_URL, link_tag.get("href"))
 
-                    products.append({
-                        "name": name,
-                        "price": price,
-                        "bonus": bonus,
-                        "url": link
-                    })
+# 📦 Получение товаров из категории (страницы качаются параллельно)
+async def fetch_products_for_category_async(category_url, max_pages=1):
+    products = None
 
-        logging.info(f"[fetch_products_for_category] Найдено товаров: {len(products)}")
+    if WB_SOURCE == "api":
+        products = await wb_api.fetch_products_api(category_url, max_pages)
 
-    except Exception as e:
-        logging.error("[fetch_products_for_category] Ошибка: %s", repr(e))
+    if products is None:
+        pages = await asyncio.gather(*(
+            _fetch_products_page_html(category_url, page)
+            for page in range(1, max_pages + 1)
+        ))
+        products = [item for page_items in pages if page_items for item in page_items]
+
+    logging.info(f"[fetch_products_for_category] Найдено товаров: {len(products)}")
 
     return products
+
+
+# 🔁 Синхронные обёртки для старого кода
+def fetch_categories():
+    return run_sync(fetch_categories_async())
+
+
+def fetch_products_for_category(category_url, max_pages=1):
+    return run_sync(fetch_products_for_category_async(category_url, max_pages))
+
+
+# 🕷 Запуск фонового обходчика: python monitor_playwright.py --crawl
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Парсер Wildberries")
+    parser.add_argument("--crawl", action="store_true", help="индексировать все категории по расписанию")
+    parser.add_argument("--once", action="store_true", help="выполнить один проход и выйти")
+    args = parser.parse_args()
+
+    if args.crawl:
+        from crawler import main
+
+        asyncio.run(main(once=args.once))
+    else:
+        parser.print_help()
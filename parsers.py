@@ -0,0 +1,333 @@
+import logging
+import os
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+# 🧩 Извлечение карточек товаров из HTML с выбором движка
+#   bs4        — эталон: BeautifulSoup + html.parser (чистый Python)
+#   lxml       — дерево lxml + XPath
+#   selectolax — быстрый C-парсер
+#   stream     — потоковый разбор без построения DOM (чистый Python)
+#   auto       — selectolax, затем lxml, иначе stream
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as SelectolaxParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser as SelectolaxParser
+    except ImportError:
+        SelectolaxParser = None
+
+try:
+    import lxml.html as lxml_html
+except ImportError:
+    lxml_html = None
+
+WB_PARSER = os.getenv("WB_PARSER", "auto")
+
+CARD_CLASS = "product-card"
+NAME_CLASS = "product-card__name"
+PRICE_CLASS = "price__lower-price"
+BONUS_CLASS = "product-card__bonus-percent"
+
+
+# 🛍 Сборка товара из текстов карточки — общая для всех движков
+def _make_product(base_url, name, price_text, bonus_text, href):
+    price = int(price_text.replace("₽", "").replace(" ", ""))
+    bonus = 0
+
+    if bonus_text is not None:
+        try:
+            bonus = int("".join(filter(str.isdigit, bonus_text)))
+        except ValueError:
+            pass
+
+    return {
+        "name": name,
+        "price": price,
+        "bonus": bonus,
+        "url": urljoin(base_url, href)
+    }
+
+
+# 🍲 BeautifulSoup + html.parser
+def _parse_bs4(html, base_url):
+    products = []
+    soup = BeautifulSoup(html, "html.parser")
+
+    for card in soup.select(f"div.{CARD_CLASS}"):
+        name_tag = card.select_one(f".{NAME_CLASS}")
+        price_tag = card.select_one(f".{PRICE_CLASS}")
+        bonus_tag = card.select_one(f".{BONUS_CLASS}")
+        link_tag = card.select_one("a")
+
+        if name_tag and price_tag and link_tag:
+            products.append(_make_product(
+                base_url,
+                name_tag.get_text(strip=True),
+                price_tag.get_text(strip=True),
+                bonus_tag.get_text(strip=True) if bonus_tag else None,
+                link_tag.get("href"),
+            ))
+
+    return products
+
+
+# ⚡ selectolax
+def _parse_selectolax(html, base_url):
+    products = []
+    tree = SelectolaxParser(html)
+    # Текст script/style/template не входит в поле — так же, как get_text() в bs4
+    tree.strip_tags(["script", "style", "template"])
+
+    for card in tree.css(f"div.{CARD_CLASS}"):
+        name_tag = card.css_first(f".{NAME_CLASS}")
+        price_tag = card.css_first(f".{PRICE_CLASS}")
+        bonus_tag = card.css_first(f".{BONUS_CLASS}")
+        link_tag = card.css_first("a")
+
+        if name_tag and price_tag and link_tag:
+            products.append(_make_product(
+                base_url,
+                name_tag.text(strip=True),
+                price_tag.text(strip=True),
+                bonus_tag.text(strip=True) if bonus_tag else None,
+                link_tag.attributes.get("href"),
+            ))
+
+    return products
+
+
+# 🌳 lxml
+def _has_class(cls):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+
+# Текст script/style/template не входит в поле — так же, как get_text() в bs4
+LXML_TEXT = "descendant::text()[not(ancestor::script or ancestor::style or ancestor::template)]"
+
+
+def _lxml_text(el):
+    return "".join(s.strip() for s in el.xpath(LXML_TEXT))
+
+
+def _parse_lxml(html, base_url):
+    products = []
+    if not html.strip():
+        return products
+
+    tree = lxml_html.fromstring(html)
+
+    for card in tree.xpath(f"//div[{_has_class(CARD_CLASS)}]"):
+        name_tag = card.xpath(f"(.//*[{_has_class(NAME_CLASS)}])[1]")
+        price_tag = card.xpath(f"(.//*[{_has_class(PRICE_CLASS)}])[1]")
+        bonus_tag = card.xpath(f"(.//*[{_has_class(BONUS_CLASS)}])[1]")
+        link_tag = card.xpath("(.//a)[1]")
+
+        if name_tag and price_tag and link_tag:
+            products.append(_make_product(
+                base_url,
+                _lxml_text(name_tag[0]),
+                _lxml_text(price_tag[0]),
+                _lxml_text(bonus_tag[0]) if bonus_tag else None,
+                link_tag[0].get("href"),
+            ))
+
+    return products
+
+
+# 🌊 Потоковый разбор: держим только стек тегов и тексты нужных полей
+VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+SKIP_TEXT_TAGS = {"script", "style", "template"}
+FIELD_CLASSES = (("name", NAME_CLASS), ("price", PRICE_CLASS), ("bonus", BONUS_CLASS))
+
+
+class StreamingExtractor(HTMLParser):
+    def __init__(self, base_url):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.products = []
+        self.stack = []
+        self.cards = []
+        self.text = []
+        self.skip_depth = None
+
+    # Карточки бывают вложенными — каждая копит свои поля, место в выдаче занимается по открытию, как в bs4
+    def _start_card(self, depth):
+        self.cards.append({
+            "depth": depth,
+            "slot": len(self.products),
+            "fields": {},
+            "open_fields": {},
+            "href": None,
+            "has_link": False,
+        })
+        self.products.append(None)
+
+    def _finish_card(self):
+        card = self.cards.pop()
+        fields = card["fields"]
+
+        if "name" in fields and "price" in fields and card["has_link"]:
+            bonus = fields.get("bonus")
+            self.products[card["slot"]] = _make_product(
+                self.base_url,
+                "".join(fields["name"]),
+                "".join(fields["price"]),
+                "".join(bonus) if bonus is not None else None,
+                card["href"],
+            )
+
+    # Текст копится до ближайшего тега — куски одного узла склеиваются, как в bs4
+    def _flush_text(self):
+        if not self.text:
+            return
+
+        data = "".join(self.text).strip()
+        self.text = []
+
+        if data and self.skip_depth is None:
+            for card in self.cards:
+                for field in card["open_fields"]:
+                    card["fields"][field].append(data)
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+
+        if tag in VOID_TAGS:
+            return
+
+        self.stack.append(tag)
+        depth = len(self.stack)
+
+        if tag in SKIP_TEXT_TAGS and self.skip_depth is None:
+            self.skip_depth = depth
+
+        classes = None
+        for key, value in attrs:
+            if key == "class" and value:
+                classes = value.split()
+                break
+
+        for card in self.cards:
+            if classes:
+                for field, cls in FIELD_CLASSES:
+                    if cls in classes and field not in card["fields"]:
+                        card["fields"][field] = []
+                        card["open_fields"][field] = depth
+
+            if tag == "a" and not card["has_link"]:
+                card["has_link"] = True
+                card["href"] = dict(attrs).get("href")
+
+        if tag == "div" and classes and CARD_CLASS in classes:
+            self._start_card(depth)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+
+        if tag not in self.stack:
+            return
+
+        while self.stack:
+            depth = len(self.stack)
+            closed = self.stack.pop()
+
+            if self.skip_depth == depth:
+                self.skip_depth = None
+
+            for card in self.cards:
+                for field, field_depth in list(card["open_fields"].items()):
+                    if field_depth >= depth:
+                        del card["open_fields"][field]
+
+            if self.cards and self.cards[-1]["depth"] == depth:
+                self._finish_card()
+
+            if closed == tag:
+                break
+
+    def handle_data(self, data):
+        self.text.append(data)
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def close(self):
+        super().close()
+        self._flush_text()
+
+        # Незакрытые теги в конце документа закрываем, как это сделал бы bs4
+        while self.stack:
+            self.handle_endtag(self.stack[-1])
+
+        # Карточки без обязательных полей оставили пустые места
+        self.products = [product for product in self.products if product is not None]
+
+
+def _parse_stream(html, base_url):
+    extractor = StreamingExtractor(base_url)
+    extractor.feed(html)
+    extractor.close()
+    return extractor.products
+
+
+BACKENDS = {
+    "bs4": _parse_bs4,
+    "stream": _parse_stream,
+}
+if SelectolaxParser is not None:
+    BACKENDS["selectolax"] = _parse_selectolax
+if lxml_html is not None:
+    BACKENDS["lxml"] = _parse_lxml
+
+
+# 🎛 Выбор движка по имени (неизвестный или неустановленный — bs4)
+def get_backend(name=None):
+    name = name or WB_PARSER
+
+    if name == "auto":
+        for candidate in ("selectolax", "lxml", "stream"):
+            if candidate in BACKENDS:
+                return BACKENDS[candidate]
+
+    if name not in BACKENDS:
+        logging.warning(f"[parsers] Движок {name} недоступен, используется bs4")
+        return BACKENDS["bs4"]
+
+    return BACKENDS[name]
+
+
+# 📦 Товары со страницы категории
+def parse_products(html, base_url, backend=None):
+    return get_backend(backend)(html, base_url)
+
+
+# 🧪 Сверка движков с эталоном: python parsers.py fixtures/*.html (то же проверяет tests/test_parsers.py)
+if __name__ == "__main__":
+    import sys
+
+    failed = False
+
+    for path in sys.argv[1:]:
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+
+        expected = _parse_bs4(html, "https://www.wildberries.ru")
+
+        for name, backend in BACKENDS.items():
+            ok = backend(html, "https://www.wildberries.ru") == expected
+            failed = failed or not ok
+            print(f"{'✅' if ok else '❌'} {path} [{name}]: товаров {len(expected)}")
+
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,91 @@
+import heapq
+from array import array
+from itertools import compress, repeat
+from operator import and_, ge
+
+# 📊 Товары категории колонками: так они лежат в кэше и так же ранжируются
+#   В кэше — по списку на поле вместо словаря на товар, в памяти — массивы цен, бонусов и процентов
+#   Фильтр порогов — map/compress по массивам, лучшие — heapq.nlargest по индексам
+#   Словарь товара собирается только для того, что показывается пользователю
+
+FIELDS = ("name", "price", "bonus", "url")
+
+
+def _pct(price, bonus):
+    return bonus * 100 / price if price > 0 else 0.0
+
+
+# 🧾 Компактная запись товара [name, price, bonus, url] — для списков результатов в Redis
+def to_record(item):
+    return [item[field] for field in FIELDS]
+
+
+def from_record(record):
+    # Списки результатов, сохранённые словарями до перехода на записи, живут до RESULTS_TTL
+    if isinstance(record, dict):
+        return record
+    return dict(zip(FIELDS, record))
+
+
+class ProductTable:
+    __slots__ = ("names", "prices", "bonuses", "pcts", "urls")
+
+    def __init__(self):
+        self.names = []
+        self.prices = array("l")
+        self.bonuses = array("l")
+        self.pcts = array("d")
+        self.urls = []
+
+    # Колонки из кэша: {"name": [...], "price": [...], "bonus": [...], "url": [...]}
+    @classmethod
+    def from_columns(cls, columns):
+        table = cls()
+        table.names = list(columns["name"])
+        table.prices = array("l", columns["price"])
+        table.bonuses = array("l", columns["bonus"])
+        table.pcts = array("d", map(_pct, table.prices, table.bonuses))
+        table.urls = list(columns["url"])
+
+        if not len(table.names) == len(table.prices) == len(table.bonuses) == len(table.urls):
+            raise ValueError("колонки разной длины")
+
+        return table
+
+    # Товары от парсера — один раз на загрузку, дальше таблица живёт в кэше
+    @classmethod
+    def from_dicts(cls, items):
+        return cls.from_columns({field: [item[field] for item in items] for field in FIELDS})
+
+    def columns(self):
+        return {
+            "name": self.names,
+            "price": self.prices.tolist(),
+            "bonus": self.bonuses.tolist(),
+            "url": self.urls
+        }
+
+    def __len__(self):
+        return len(self.prices)
+
+    def record(self, i):
+        return [self.names[i], self.prices[i], self.bonuses[i], self.urls[i]]
+
+    def row(self, i):
+        return from_record(self.record(i))
+
+    # 🔎 Индексы товаров с бонусом не ниже порогов
+    def filter(self, min_pct, min_rub):
+        mask = map(and_, map(ge, self.bonuses, repeat(min_rub)), map(ge, self.pcts, repeat(min_pct)))
+        return list(compress(range(len(self)), mask))
+
+    # 🏆 Индексы лучших по проценту бонуса (limit=None — все подходящие, по убыванию)
+    def top(self, min_pct, min_rub, limit=None):
+        indices = self.filter(min_pct, min_rub)
+        key = self.pcts.__getitem__
+
+        if limit is not None and limit < len(indices):
+            return heapq.nlargest(limit, indices, key=key)
+
+        indices.sort(key=key, reverse=True)
+        return indices
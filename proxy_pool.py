@@ -0,0 +1,128 @@
+import logging
+import os
+import time
+from urllib.parse import urlsplit
+
+# 🛡 Пул прокси: оценка здоровья, задержка, охлаждение после 429/403 и ротация
+
+PROXY_COOLDOWN = float(os.getenv("PROXY_COOLDOWN", 60))
+PROXY_MAX_COOLDOWN = float(os.getenv("PROXY_MAX_COOLDOWN", 900))
+# Прокси с оценкой ниже порога берутся, только если здоровых не осталось
+PROXY_MIN_SCORE = float(os.getenv("PROXY_MIN_SCORE", 0.3))
+# Вес нового наблюдения в скользящих средних
+EWMA_ALPHA = 0.2
+BAN_STATUSES = {403, 429}
+
+
+class Proxy:
+    __slots__ = ("url", "score", "latency", "cooldown_until", "strikes", "failures", "requests")
+
+    def __init__(self, url):
+        self.url = url
+        self.score = 1.0
+        self.latency = 0.0
+        self.cooldown_until = 0.0
+        self.strikes = 0
+        self.failures = 0
+        self.requests = 0
+
+    def __repr__(self):
+        return f"Proxy({self.label}, score={self.score:.2f}, latency={self.latency:.2f}s)"
+
+    # Адрес без логина и пароля — для логов
+    @property
+    def label(self):
+        if self.url is None:
+            return "direct"
+        parts = urlsplit(self.url)
+        return f"{parts.hostname}:{parts.port}" if parts.port else parts.hostname
+
+
+# 📄 Список прокси: PROXY_URLS (через запятую), PROXY_FILE (по строке) или старый PROXY_URL
+def load_proxies():
+    urls = [u.strip() for u in os.getenv("PROXY_URLS", "").replace("\n", ",").split(",")]
+
+    proxy_file = os.getenv("PROXY_FILE")
+    if proxy_file:
+        try:
+            with open(proxy_file, encoding="utf-8") as f:
+                urls += [line.strip() for line in f if not line.lstrip().startswith("#")]
+        except OSError as e:
+            logging.error("[proxy_pool] Не удалось прочитать %s: %s", proxy_file, repr(e))
+
+    urls.append(os.getenv("PROXY_URL", "").strip())
+
+    # Порядок сохраняем, дубликаты и пустые строки убираем
+    return list(dict.fromkeys(u for u in urls if u))
+
+
+class ProxyPool:
+    # Пустой список — запросы идут напрямую
+    def __init__(self, urls=None):
+        self.proxies = [Proxy(url) for url in urls] if urls else [Proxy(None)]
+        self.cursor = 0
+
+    def __len__(self):
+        return len(self.proxies)
+
+    # 🔄 Следующий прокси по кругу: сначала здоровые, затем остывшие, затем ближайший к концу охлаждения
+    def acquire(self):
+        now = time.monotonic()
+        count = len(self.proxies)
+        ready = []
+
+        for offset in range(count):
+            proxy = self.proxies[(self.cursor + offset) % count]
+            if proxy.cooldown_until <= now:
+                ready.append(proxy)
+
+        self.cursor = (self.cursor + 1) % count
+
+        healthy = [p for p in ready if p.score >= PROXY_MIN_SCORE]
+        if healthy:
+            return healthy[0]
+        if ready:
+            return max(ready, key=lambda p: p.score)
+
+        return min(self.proxies, key=lambda p: p.cooldown_until)
+
+    # Сколько ждать, пока прокси выйдет из охлаждения
+    def wait_time(self, proxy):
+        return max(proxy.cooldown_until - time.monotonic(), 0.0)
+
+    # 📈 Результат запроса через прокси: код ответа (None — сетевая ошибка) и время
+    #   На здоровье прокси влияют только сетевые ошибки и 403/429
+    def report(self, proxy, status, latency):
+        proxy.requests += 1
+
+        if status is not None:
+            proxy.latency = latency if proxy.requests == 1 else (
+                (1 - EWMA_ALPHA) * proxy.latency + EWMA_ALPHA * latency
+            )
+
+        # Прямое соединение не банится и не охлаждается — темп держит лимитер хоста
+        if proxy.url is None:
+            return
+
+        # Любой ответ, кроме 403/429, — прокси работает (5xx — проблема хоста, не прокси)
+        if status is not None and status not in BAN_STATUSES:
+            proxy.score = (1 - EWMA_ALPHA) * proxy.score + EWMA_ALPHA
+            proxy.strikes = 0
+            proxy.failures = 0
+            return
+
+        proxy.score = (1 - EWMA_ALPHA) * proxy.score
+
+        if status in BAN_STATUSES:
+            # Каждый следующий бан подряд — охлаждение вдвое дольше
+            cooldown = min(PROXY_COOLDOWN * 2 ** proxy.strikes, PROXY_MAX_COOLDOWN)
+            proxy.strikes += 1
+            proxy.cooldown_until = time.monotonic() + cooldown
+            logging.warning(f"[proxy_pool] {proxy.label}: код {status}, охлаждение {cooldown:.0f} с")
+            return
+
+        proxy.failures += 1
+        if proxy.failures >= 3:
+            proxy.cooldown_until = time.monotonic() + PROXY_COOLDOWN
+            proxy.failures = 0
+            logging.warning(f"[proxy_pool] {proxy.label}: ошибки подряд, охлаждение {PROXY_COOLDOWN:.0f} с")
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+import alerts
+from products import ProductTable
+
+CATEGORY = "https://www.wildberries.ru/catalog/zhenshchinam"
+
+
+def product(nm_id, price=1000, bonus=300, query=""):
+    return {
+        "name": f"Товар {nm_id}",
+        "price": price,
+        "bonus": bonus,
+        "url": f"https://www.wildberries.ru/catalog/{nm_id}/detail.aspx{query}",
+    }
+
+
+def urls(items):
+    return [item["url"] for item in items]
+
+
+def test_diff_merges_fingerprints(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    now = [1_000_000.0]
+    monkeypatch.setattr(alerts.time, "time", lambda: now[0])
+
+    async def scenario():
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+
+        async def diff(*items):
+            return urls(await alerts.diff_products(redis, CATEGORY, ProductTable.from_dicts(items)))
+
+        # Первый проход только запоминает
+        assert await diff(product(1), product(2)) == []
+
+        # Товар 2 выпал со страницы, появился 3
+        assert await diff(product(1), product(3)) == urls([product(3)])
+
+        # Товар 2 вернулся без изменений — не новый; та же ссылка с query (HTML) — тоже
+        assert await diff(product(1), product(2), product(3, query="?size=123")) == []
+
+        # Изменился бонус — уведомляем
+        assert await diff(product(1), product(2, bonus=500)) == urls([product(2)])
+
+        # Товара 3 не было дольше ALERTS_FORGET_AFTER — его отпечаток забыт
+        now[0] += alerts.ALERTS_FORGET_AFTER / 2
+        await diff(product(1), product(2, bonus=500))
+        now[0] += alerts.ALERTS_FORGET_AFTER / 2 + 1
+        assert await diff(product(1), product(2, bonus=500), product(3)) == urls([product(3)])
+
+    asyncio.run(scenario())
+
+
+def test_format_item_escapes_html():
+    text = alerts.format_item(product(1) | {
+        "name": "Рубашка & галстук <XL>",
+        "url": "https://www.wildberries.ru/catalog/1/detail.aspx?a=1&b='2'",
+    })
+
+    assert "Рубашка &amp; галстук &lt;XL&gt;" in text
+    assert "href='https://www.wildberries.ru/catalog/1/detail.aspx?a=1&amp;b=&#x27;2&#x27;'" in text
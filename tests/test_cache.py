@@ -0,0 +1,107 @@
+import asyncio
+import json
+import time
+
+import cache
+
+KEY = "wb:cache:test"
+TTL = 60
+
+
+# 🧪 Заглушка Redis: только get/set, которые нужны кэшу
+class StubRedis:
+    def __init__(self, data=None):
+        self.data = dict(data or {})
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+def entry(data, age=0):
+    return json.dumps({"ts": time.time() - age, "data": data})
+
+
+# 🧪 Загрузчик, который считает вызовы и отдаёт данные не сразу
+class Loader:
+    def __init__(self, value, delay=0.05):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.value
+
+
+def test_concurrent_misses_share_one_load():
+    redis = StubRedis()
+    loader = Loader(["fresh"])
+
+    async def scenario():
+        return await asyncio.gather(*(
+            cache._cached(redis, "test", KEY, loader, TTL) for _ in range(20)
+        ))
+
+    results = asyncio.run(scenario())
+
+    assert results == [["fresh"]] * 20
+    assert loader.calls == 1
+    assert json.loads(redis.data[KEY])["data"] == ["fresh"]
+
+
+def test_hit_does_not_load():
+    redis = StubRedis({KEY: entry(["cached"])})
+    loader = Loader(["fresh"])
+
+    assert asyncio.run(cache._cached(redis, "test", KEY, loader, TTL)) == ["cached"]
+    assert loader.calls == 0
+
+
+def test_stale_is_served_while_refreshing():
+    redis = StubRedis({KEY: entry(["old"], age=TTL + 1)})
+    loader = Loader(["fresh"])
+
+    async def scenario():
+        result = await cache._cached(redis, "test", KEY, loader, TTL)
+        # Обновление запущено в фоне, в Redis пока старые данные
+        stored = json.loads(redis.data[KEY])["data"]
+        await cache._inflight[KEY]
+        return result, stored
+
+    result, stored = asyncio.run(scenario())
+
+    assert result == ["old"]
+    assert stored == ["old"]
+    assert loader.calls == 1
+    assert json.loads(redis.data[KEY])["data"] == ["fresh"]
+
+
+def test_fresh_waits_for_refresh():
+    redis = StubRedis({KEY: entry(["old"], age=TTL + 1)})
+    loader = Loader(["fresh"])
+
+    result = asyncio.run(cache._cached(redis, "test", KEY, loader, TTL, fresh=True))
+
+    assert result == ["fresh"]
+    assert loader.calls == 1
+
+
+def test_empty_result_is_not_cached():
+    redis = StubRedis()
+    loader = Loader([])
+
+    assert asyncio.run(cache._cached(redis, "test", KEY, loader, TTL)) == []
+    assert KEY not in redis.data
+
+
+def test_broken_entry_is_a_miss():
+    for raw in ("{not json", json.dumps(["old", "format"]), json.dumps({"data": []})):
+        redis = StubRedis({KEY: raw})
+        loader = Loader(["fresh"])
+
+        assert asyncio.run(cache._cached(redis, "test", KEY, loader, TTL)) == ["fresh"]
+        assert loader.calls == 1
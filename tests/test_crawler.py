@@ -0,0 +1,78 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+import crawler
+
+CATEGORY = "https://www.wildberries.ru/catalog/zhenshchinam"
+
+
+async def fill_index(redis, items):
+    items_key, pct_key = crawler._index_keys(CATEGORY)
+    await redis.hset(items_key, mapping={item["url"]: json.dumps(item, ensure_ascii=False) for item in items})
+    await redis.zadd(pct_key, {item["url"]: crawler.bonus_pct(item) for item in items})
+    await redis.hset(crawler.UPDATED_KEY, CATEGORY, time.time())
+
+
+def make_items(count):
+    # Бонус в % растёт с номером, бонус в рублях у нечётных ниже порога
+    return [
+        {
+            "name": f"Товар {i}",
+            "price": 10000,
+            "bonus": 2000 + i if i % 2 == 0 else 100,
+            "url": f"https://www.wildberries.ru/catalog/{i}/detail.aspx",
+        }
+        for i in range(count)
+    ]
+
+
+def test_query_index_reads_only_what_it_needs(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    items = make_items(2000)
+
+    async def scenario():
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        await fill_index(redis, items)
+
+        fetched = []
+        hmget = redis.hmget
+
+        async def counting_hmget(key, fields):
+            fetched.extend(fields)
+            return await hmget(key, fields)
+
+        monkeypatch.setattr(redis, "hmget", counting_hmget)
+
+        top = await crawler.query_index(redis, CATEGORY, 20, 200, limit=10)
+        fetched_for_top = len(fetched)
+        everything = await crawler.query_index(redis, CATEGORY, 20, 200)
+        return top, everything, fetched_for_top
+
+    top, everything, fetched_for_top = asyncio.run(scenario())
+    expected = sorted(
+        (item for item in items if item["bonus"] >= 200 and crawler.bonus_pct(item) >= 20),
+        key=crawler.bonus_pct, reverse=True,
+    )
+
+    assert top == expected[:10]
+    assert everything == expected
+    assert len(everything) == 1000
+    # Для 10 лучших читается один кусок, а не все 1000 подходящих по проценту
+    assert fetched_for_top == crawler.INDEX_QUERY_CHUNK
+
+
+def test_query_index_missing_or_stale(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def scenario():
+        redis = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        missing = await crawler.query_index(redis, CATEGORY, 20, 200)
+        await fill_index(redis, make_items(10))
+        monkeypatch.setattr(crawler, "INDEX_MAX_AGE", -1)
+        stale = await crawler.query_index(redis, CATEGORY, 20, 200)
+        return missing, stale
+
+    assert asyncio.run(scenario()) == (None, None)
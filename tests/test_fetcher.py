@@ -0,0 +1,164 @@
+import asyncio
+import time
+
+import pytest
+from aiohttp import web
+
+import fetcher
+from proxy_pool import ProxyPool
+
+TARGET = "http://wb.test/catalog"
+
+
+@pytest.fixture(autouse=True)
+def fast_fetcher(monkeypatch):
+    monkeypatch.setattr(fetcher, "WB_BACKOFF_BASE", 0.01)
+    monkeypatch.setattr(fetcher, "proxy_pool", ProxyPool())
+
+
+# 🧪 Локальный сервер на 127.0.0.1: отвечает кодами из statuses по очереди (последний — дальше всегда)
+#   Годится и как цель, и как HTTP-прокси — aiohttp шлёт через прокси обычный GET
+async def start_server(statuses):
+    hits = []
+
+    async def handler(request):
+        hits.append(request.path)
+        status = statuses[min(len(hits), len(statuses)) - 1]
+        return web.Response(status=status, text="ok" if status == 200 else "")
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+
+    host, port = runner.addresses[0][:2]
+    return runner, f"http://{host}:{port}", hits
+
+
+def run(coro):
+    return fetcher.run_sync(coro)
+
+
+def test_rotates_away_from_banned_proxy():
+    async def scenario():
+        banned, banned_url, banned_hits = await start_server([429])
+        good, good_url, good_hits = await start_server([200])
+        fetcher.proxy_pool = ProxyPool([banned_url, good_url])
+
+        try:
+            results = [await fetcher.fetch_text(TARGET) for _ in range(3)]
+        finally:
+            await banned.cleanup()
+            await good.cleanup()
+
+        return results, banned_hits, good_hits
+
+    results, banned_hits, good_hits = run(scenario())
+
+    assert results == [(200, "ok")] * 3
+    assert len(banned_hits) == 1
+    assert len(good_hits) == 3
+    assert fetcher.proxy_pool.proxies[0].cooldown_until > time.monotonic()
+
+
+def test_retries_until_success():
+    async def scenario():
+        runner, url, hits = await start_server([429, 429, 200])
+        try:
+            return await fetcher.fetch_text(f"{url}/catalog"), hits
+        finally:
+            await runner.cleanup()
+
+    result, hits = run(scenario())
+
+    assert result == (200, "ok")
+    assert len(hits) == 3
+
+
+def test_server_error_does_not_hurt_proxy(monkeypatch):
+    monkeypatch.setattr(fetcher, "WB_RETRIES", 1)
+
+    async def scenario():
+        runner, url, hits = await start_server([503])
+        fetcher.proxy_pool = ProxyPool([url])
+        try:
+            return await fetcher.fetch_text(TARGET), hits
+        finally:
+            await runner.cleanup()
+
+    result, hits = run(scenario())
+    proxy = fetcher.proxy_pool.proxies[0]
+
+    assert result == (503, "")
+    assert len(hits) == 2
+    assert proxy.score == pytest.approx(1.0)
+    assert proxy.cooldown_until == 0.0
+
+
+def test_cooling_proxy_is_not_used():
+    async def scenario():
+        runner, url, hits = await start_server([429, 200])
+        fetcher.proxy_pool = ProxyPool([url])
+        try:
+            first = await fetcher.fetch_text(TARGET)
+            second = await fetcher.fetch_text(TARGET)
+        finally:
+            await runner.cleanup()
+
+        return first, second, hits
+
+    first, second, hits = run(scenario())
+
+    assert first == (429, "")
+    assert second == (None, None)
+    assert len(hits) == 1
+
+
+def test_throttle_halves_rate_once_per_second(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(fetcher.time, "monotonic", lambda: now[0])
+    limiter = fetcher.AdaptiveLimiter(rate=8, min_rate=0.5)
+
+    limiter.on_throttle()
+    limiter.on_throttle()
+    assert limiter.rate == 4
+
+    now[0] += 0.5
+    limiter.on_throttle()
+    assert limiter.rate == 4
+
+    now[0] += 0.5
+    limiter.on_throttle()
+    assert limiter.rate == 2
+
+    for _ in range(10):
+        now[0] += 1
+        limiter.on_throttle()
+    assert limiter.rate == 0.5
+
+
+def test_limiter_spaces_requests():
+    async def scenario():
+        limiter = fetcher.AdaptiveLimiter(rate=50, burst=1)
+        started = time.monotonic()
+        for _ in range(6):
+            await limiter.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(scenario()) >= 0.08
+
+
+def test_close_session_resets_host_state():
+    async def scenario():
+        runner, url, hits = await start_server([200])
+        try:
+            await fetcher.fetch_text(f"{url}/catalog")
+        finally:
+            await runner.cleanup()
+        return dict(fetcher._rate_limits), dict(fetcher._host_limits)
+
+    rate_limits, host_limits = run(scenario())
+
+    assert rate_limits and host_limits
+    assert fetcher._rate_limits == {} and fetcher._host_limits == {}
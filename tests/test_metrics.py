@@ -0,0 +1,41 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+
+import metrics
+
+
+def test_updates_from_threads_are_not_lost():
+    counter = metrics.Counter("test_thread_total", "Test counter", ["kind"])
+    histogram = metrics.Histogram("test_thread_seconds", "Test histogram", ["kind"])
+
+    def work(_):
+        for _ in range(2000):
+            counter.inc(kind="html")
+            histogram.observe(0.01, kind="html")
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(work, range(8)))
+
+    assert counter.values[("html",)] == 16000
+    assert histogram.values[("html",)]["count"] == 16000
+    assert 'test_thread_total{kind="html"} 16000' in counter.render()
+
+
+def test_metrics_server_on_localhost():
+    async def scenario():
+        runner = await metrics.start_metrics_server(port=0)
+        try:
+            host, port = runner.addresses[0][:2]
+            async with aiohttp.ClientSession() as session:
+                async with session.get(f"http://{host}:{port}/metrics") as resp:
+                    return host, resp.status, await resp.text()
+        finally:
+            await runner.cleanup()
+
+    host, status, text = asyncio.run(scenario())
+
+    assert host == "127.0.0.1"
+    assert status == 200
+    assert "# TYPE wb_fetch_seconds histogram" in text
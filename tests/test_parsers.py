@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import pytest
+
+import parsers
+
+BASE_URL = "https://www.wildberries.ru"
+FIXTURES = Path(__file__).parent.parent / "fixtures"
+
+CASES = {
+    "nested_cards": (
+        '<div class="product-card"><a href="/catalog/1/detail.aspx">'
+        '<span class="product-card__name">Внешняя</span></a>'
+        '<ins class="price__lower-price">100 ₽</ins>'
+        '<div class="product-card"><a href="/catalog/2/detail.aspx">'
+        '<span class="product-card__name">Внутренняя</span></a>'
+        '<ins class="price__lower-price">200 ₽</ins>'
+        '<span class="product-card__bonus-percent">50 ₽</span></div>'
+        '</div>'
+    ),
+    "script_in_fields": (
+        '<div class="product-card"><a href="/catalog/3/detail.aspx">'
+        '<span class="product-card__name">Блузка<script>var x = "<b>";</script> белая</span></a>'
+        '<ins class="price__lower-price">1 500<style>.a{}</style> ₽</ins>'
+        '<span class="product-card__bonus-percent"><template>9</template>300 ₽</span></div>'
+    ),
+    "comments_and_entities": (
+        '<div class="product-card"><a href="/catalog/4/detail.aspx">'
+        '<span class="product-card__name">Рубашка &amp; <!-- x -->галстук</span></a>'
+        '<ins class="price__lower-price">2&#32;000 ₽</ins></div>'
+    ),
+    "unclosed_tags": (
+        '<div class="product-card"><a href="/catalog/5/detail.aspx">'
+        '<span class="product-card__name">Платье<br>летнее</span></a>'
+        '<ins class="price__lower-price">990 ₽</ins><p>текст'
+    ),
+}
+
+
+def _documents():
+    for path in sorted(FIXTURES.glob("category_page*.html")):
+        yield path.name, path.read_text(encoding="utf-8")
+    yield from CASES.items()
+
+
+DOCUMENTS = dict(_documents())
+
+
+@pytest.mark.parametrize("backend", sorted(parsers.BACKENDS))
+@pytest.mark.parametrize("document", sorted(DOCUMENTS))
+def test_backend_matches_bs4(backend, document):
+    html = DOCUMENTS[document]
+    expected = parsers.parse_products(html, BASE_URL, backend="bs4")
+
+    assert expected
+    assert parsers.parse_products(html, BASE_URL, backend=backend) == expected
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64])
+def test_stream_chunked_feed(chunk_size):
+    html = DOCUMENTS["category_page.html"]
+    extractor = parsers.StreamingExtractor(BASE_URL)
+
+    for start in range(0, len(html), chunk_size):
+        extractor.feed(html[start:start + chunk_size])
+    extractor.close()
+
+    assert extractor.products == parsers.parse_products(html, BASE_URL, backend="bs4")
+
+
+def test_auto_never_picks_bs4():
+    assert parsers.get_backend("auto") is not parsers.BACKENDS["bs4"]
@@ -0,0 +1,68 @@
+import asyncio
+import heapq
+import json
+
+import cache
+from products import ProductTable, from_record, to_record
+
+ITEMS = [
+    {"name": "Платье", "price": 1000, "bonus": 300, "url": "https://www.wildberries.ru/catalog/1/detail.aspx"},
+    {"name": "Блузка", "price": 2000, "bonus": 100, "url": "https://www.wildberries.ru/catalog/2/detail.aspx"},
+    {"name": "Юбка", "price": 500, "bonus": 250, "url": "https://www.wildberries.ru/catalog/3/detail.aspx"},
+    {"name": "Шарф", "price": 0, "bonus": 500, "url": "https://www.wildberries.ru/catalog/4/detail.aspx"},
+    {"name": "Сумка", "price": 4000, "bonus": 800, "url": "https://www.wildberries.ru/catalog/5/detail.aspx"},
+]
+
+
+def test_columns_round_trip():
+    table = ProductTable.from_dicts(ITEMS)
+    restored = ProductTable.from_columns(json.loads(json.dumps(table.columns())))
+
+    assert [restored.row(i) for i in range(len(restored))] == ITEMS
+
+
+def test_top_matches_plain_ranking():
+    table = ProductTable.from_dicts(ITEMS)
+    matches = [
+        item for item in ITEMS
+        if item["price"] > 0 and item["bonus"] >= 200 and item["bonus"] * 100 >= 20 * item["price"]
+    ]
+
+    for limit in (None, 1, 2):
+        expected = heapq.nlargest(limit or len(matches), matches, key=lambda item: item["bonus"] / item["price"])
+        assert [table.row(i) for i in table.top(20, 200, limit)] == expected
+
+
+def test_records_and_legacy_dicts():
+    assert from_record(to_record(ITEMS[0])) == ITEMS[0]
+    assert from_record(ITEMS[0]) == ITEMS[0]
+
+
+def test_cache_stores_columns(monkeypatch):
+    category_url = "https://www.wildberries.ru/catalog/zhenshchinam"
+    key = f"{cache.CACHE_PREFIX}:products:1:{category_url}"
+
+    class StubRedis:
+        # Свежая запись в старом формате (список словарей) — должна считаться промахом
+        data = {key: json.dumps({"ts": 4102444800, "data": ITEMS})}
+
+        async def get(self, key):
+            return self.data.get(key)
+
+        async def set(self, key, value, ex=None):
+            self.data[key] = value
+
+    calls = []
+
+    async def fetch(category_url, max_pages):
+        calls.append(category_url)
+        return ITEMS
+
+    redis = StubRedis()
+    monkeypatch.setattr(cache, "fetch_products_for_category_async", fetch)
+
+    table = asyncio.run(cache.get_products(redis, category_url))
+
+    assert calls == [category_url]
+    assert isinstance(table, ProductTable)
+    assert json.loads(redis.data[key])["data"] == table.columns()
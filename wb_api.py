@@ -0,0 +1,171 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+import metrics
+from fetcher import fetch_bytes
+
+# 🧾 Источник товаров через JSON API каталога Wildberries (вместо разбора HTML)
+
+try:
+    import orjson
+
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+WB_BASE_URL = "https://www.wildberries.ru"
+WB_MENU_URL = os.getenv(
+    "WB_MENU_URL", "https://static-basket-01.wbbasket.ru/vol0/data/main-menu-ru-ru-v3.json"
+)
+WB_API_URL = os.getenv("WB_API_URL", "https://catalog.wb.ru/catalog/{shard}/v2/catalog")
+WB_DEST = os.getenv("WB_DEST", "-1257786")
+# Сколько страниц запрашивается одновременно в одной пачке
+WB_API_BATCH = int(os.getenv("WB_API_BATCH", 5))
+WB_MENU_TTL = int(os.getenv("WB_MENU_TTL", 6 * 3600))
+# После неудачной загрузки меню повторяем не раньше чем через столько секунд
+WB_MENU_RETRY = int(os.getenv("WB_MENU_RETRY", 300))
+
+_menu = {"ts": 0.0, "paths": {}}
+_menu_lock = None
+
+
+# ⚠️ Ответ API не похож на ожидаемый — переключаемся на HTML
+class ApiShapeError(Exception):
+    pass
+
+
+# 🗺 Плоская карта «путь категории -> (shard, query)» из дерева меню
+def _walk_menu(nodes, paths):
+    for node in nodes:
+        url = node.get("url")
+        shard = node.get("shard")
+        query = node.get("query")
+
+        if url and shard and query and shard != "blackhole":
+            paths[url.rstrip("/")] = (shard, query)
+
+        _walk_menu(node.get("childs") or [], paths)
+
+    return paths
+
+
+async def _load_menu():
+    global _menu_lock
+
+    if _menu_lock is None:
+        _menu_lock = asyncio.Lock()
+
+    async with _menu_lock:
+        if time.time() - _menu["ts"] < WB_MENU_TTL:
+            return _menu["paths"]
+
+        status, body = await fetch_bytes(WB_MENU_URL)
+
+        try:
+            if status != 200:
+                raise ValueError(f"код ответа {status}")
+            _menu["paths"] = _walk_menu(json_loads(body), {})
+            _menu["ts"] = time.time()
+        except (ValueError, TypeError, AttributeError) as e:
+            # Неудача тоже запоминается: до следующей попытки сразу идём в HTML
+            logging.warning("[wb_api] Меню недоступно: %s", repr(e))
+            _menu["ts"] = time.time() - WB_MENU_TTL + WB_MENU_RETRY
+
+        return _menu["paths"]
+
+
+# 🔑 shard и query категории по её URL на сайте
+async def resolve_category(category_url):
+    paths = await _load_menu()
+    return paths.get(urlsplit(category_url).path.rstrip("/"))
+
+
+# 🛍 Товар API -> словарь в том же формате, что и у HTML-парсера, None — товара нет в продаже
+def _to_product(raw):
+    sizes = raw.get("sizes")
+
+    if sizes and "price" in sizes[0]:
+        price = sizes[0]["price"]["product"]
+    elif "salePriceU" in raw:
+        price = raw["salePriceU"]
+    else:
+        return None
+
+    return {
+        "name": raw["name"],
+        "price": int(price) // 100,
+        "bonus": int(raw.get("feedbackPoints") or 0),
+        "url": f"{WB_BASE_URL}/catalog/{raw['id']}/detail.aspx"
+    }
+
+
+# 📄 Одна страница каталога через API
+async def _fetch_page(shard, query, page):
+    params = {
+        "appType": 1,
+        "curr": "rub",
+        "dest": WB_DEST,
+        "page": page,
+        "sort": "popular",
+        "spp": 30,
+        **dict(parse_qsl(query)),
+    }
+    status, body = await fetch_bytes(WB_API_URL.format(shard=shard), params=params)
+
+    if status != 200:
+        raise ApiShapeError(f"код ответа {status} для страницы {page}")
+
+    try:
+        with metrics.PARSE_SECONDS.time(kind="api"):
+            payload = json_loads(body)
+            data = payload.get("data", payload)
+            products = (_to_product(raw) for raw in data["products"])
+            return [product for product in products if product is not None]
+    except (ValueError, TypeError, KeyError, AttributeError, IndexError) as e:
+        raise ApiShapeError(repr(e)) from e
+
+
+# 📄 Страница категории через API, None — категория не найдена или API изменился
+async def fetch_products_page_api(category_url, page):
+    resolved = await resolve_category(category_url)
+    if resolved is None:
+        return None
+
+    try:
+        return await _fetch_page(*resolved, page)
+    except ApiShapeError as e:
+        logging.warning(f"[wb_api] {category_url}: {e}")
+        return None
+
+
+# 📦 Товары категории пачками страниц, None — нужно идти в HTML
+async def fetch_products_api(category_url, max_pages=1):
+    resolved = await resolve_category(category_url)
+    if resolved is None:
+        return None
+
+    products = []
+
+    try:
+        for first in range(1, max_pages + 1, WB_API_BATCH):
+            last = min(first + WB_API_BATCH, max_pages + 1)
+            pages = await asyncio.gather(*(
+                _fetch_page(*resolved, page) for page in range(first, last)
+            ))
+
+            for page_items in pages:
+                products.extend(page_items)
+
+            # Пустая страница — дальше товаров нет
+            if not all(pages):
+                break
+
+    except ApiShapeError as e:
+        logging.warning(f"[wb_api] {category_url}: {e}")
+        return None
+
+    return products